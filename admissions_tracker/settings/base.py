@@ -51,6 +51,10 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack.
+    'tracker.metrics.MetricsMiddleware',
+    # Outside the session middleware, so session writes also pin reads to the primary.
+    'tracker.replicas.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,10 +86,30 @@ TEMPLATES = [
 ]
 
 # Session configuration
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Sessions are read from their own cache and written through to the database,
+# so signed-in requests don't query django_session; a cache miss falls back to
+# the table. `manage.py purge_sessions` deletes expired rows.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Kept apart from the default cache so clearing or culling page caches never drops sessions.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+    # Rate-limit counters (tracker.throttling).
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    },
+}
+
 # Authentication configuration
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
@@ -99,6 +123,10 @@ DATABASES = {
     }
 }
 
+# Aliases in DATABASES that views decorated with tracker.replicas.read_replica read from.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['tracker.replicas.ReplicaRouter']
+
 # Static files configuration
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
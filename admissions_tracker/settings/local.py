@@ -1,4 +1,7 @@
+import os
+
 from .base import *
+from .base import MIDDLEWARE
 
 DEBUG = True
 
@@ -9,12 +12,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # A second SQLite file standing in for a read replica; `manage.py sync_replica`
+    # copies the primary into it. Reads only go there with DJANGO_READ_REPLICA=True.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+    },
 }
+DATABASE_REPLICAS = ['replica'] if os.getenv('DJANGO_READ_REPLICA') == 'True' else []
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Build and serve assets the way production does, from the local filesystem:
+#   DJANGO_ASSET_PIPELINE=True python manage.py collectstatic
+#   DJANGO_ASSET_PIPELINE=True python manage.py runserver --nostatic
+if os.getenv('DJANGO_ASSET_PIPELINE') == 'True':
+    # Templates only link the hashed names with DEBUG off.
+    DEBUG = False
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'tracker.assets.MinifiedStaticFilesStorage'},
+    }
+    MIDDLEWARE = list(MIDDLEWARE)
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'tracker.assets.StaticFilesMiddleware')
 
 # Media files
 MEDIA_URL = '/media/'
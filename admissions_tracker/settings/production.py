@@ -1,17 +1,14 @@
+import copy
 import os
 from .base import *
 from .base import INSTALLED_APPS, MIDDLEWARE
-import logging
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from dotenv import load_dotenv
 
+# Importing settings must not do any I/O beyond reading the environment: every
+# gunicorn worker runs this module on boot. Connectivity checks live in
+# tracker.health (`manage.py check_readiness` and /healthz/).
 load_dotenv()
 
-logging.basicConfig(level=logging.DEBUG)
-
 DEBUG = False  # Set to False for production
 
 ALLOWED_HOSTS = ['admissions-tracker.onrender.com', 'localhost', '127.0.0.1']
@@ -29,19 +26,83 @@ DATABASES = {
     }
 }
 
+# Reuse database connections instead of reconnecting (and renegotiating TLS) per request.
+# Each gunicorn worker process gets its own pool. Under WSGI it is sized for the
+# worker's threads. Under ASGI (gunicorn.conf.py's SERVER_MODE) Django runs each
+# in-flight request's ORM calls on a thread of its own, so the pool is sized for
+# concurrent requests instead; the rest wait up to DB_POOL_TIMEOUT for a connection.
+ASGI_DB_POOL_MAX_SIZE = 10
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', ASGI_DB_POOL_MAX_SIZE))
+else:
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', os.getenv('GUNICORN_THREADS', 2)))
+if os.getenv('DB_POOL', 'True') == 'True':
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        ConnectionPool = None
+
+    if ConnectionPool is not None:
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                # Validate a connection when it is handed out, so a dropped one is replaced.
+                'check': ConnectionPool.check_connection,
+            },
+        }
+    else:
+        # psycopg2 has no pool; keep one persistent, health-checked connection per thread.
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 600))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (tracker.replicas): comma-separated hosts sharing the primary's
+# name and credentials. Tests use the primary in their place.
+for number, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        **copy.deepcopy(DATABASES['default']), 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
 DISABLE_CONNECTION_CHECKS = True
 
-MIDDLEWARE += [
-    'admissions_tracker.middleware.ThreadLocalMiddleware',
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  
-]
+# Serve static files before sessions and auth run; right after the HTTPS redirect.
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'tracker.assets.StaticFilesMiddleware')
 
+# Shared by every gunicorn worker on the host, unlike the per-process LocMemCache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR', '/tmp/admissions_tracker_cache'),
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_SESSION_CACHE_DIR', '/tmp/admissions_tracker_sessions'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 50000)),
+        },
+    },
+    # Rate-limit counters (tracker.throttling) need an incr that is atomic
+    # across workers and hosts. Without Redis they fall back to the host's file
+    # cache, whose increments can race and let a burst slightly past the limit.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('THROTTLE_REDIS_URL'),
+    } if os.getenv('THROTTLE_REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_THROTTLE_CACHE_DIR', '/tmp/admissions_tracker_throttle'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
 }
 
 INSTALLED_APPS += [
@@ -56,32 +117,35 @@ AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
 
 AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
 AWS_DEFAULT_ACL = 'public-read'
-AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME').strip() # e.g., 'us-east-1'
+AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', '').strip() # e.g., 'us-east-1'
 
 
-# Static files configuration
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.{AWS_S3_REGION_NAME}.amazonaws.com'
-STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 
-# Media files configuration
-DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+STORAGES = {
+    # Uploaded media goes to S3.
+    'default': {'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage'},
+    # Static files are built into STATIC_ROOT by collectstatic (minified, hashed,
+    # gzip/brotli) and served by tracker.assets.StaticFilesMiddleware.
+    'staticfiles': {'BACKEND': 'tracker.assets.MinifiedStaticFilesStorage'},
+}
+# Set STATIC_HOST to a CDN origin-pulling from this app to serve assets from the edge.
+STATIC_URL = os.getenv('STATIC_HOST', '') + '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 
-# WhiteNoise configuration
-#STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 # Security settings
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = True
+# Load balancer probes call the health check over plain HTTP.
+SECURE_REDIRECT_EXEMPT = [r'^healthz/$']
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
 # Email configuration 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST')
-EMAIL_PORT = int(os.getenv('EMAIL_PORT'))
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
@@ -100,32 +164,19 @@ LOGGING = {
     },
 }
 
-print(f"Running on port: {os.getenv('PORT')}")
-
-logger = logging.getLogger(__name__)
+# Seconds a /healthz/ result is reused before the database and S3 are probed again.
+READINESS_TTL = int(os.getenv('READINESS_TTL', 30))
 
-# Test database connection
-def check_db_connection():
-    db_conn = connections['default']
-    try:
-        db_conn.cursor()
-        logger.info("Database connection is successful.")
-    except OperationalError:
-        logger.error("Database connection failed.")
+# Request metrics (tracker.metrics). Workers share their counters through
+# METRICS_DIR, which gunicorn.conf.py empties when the server starts.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1.0))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
 
-check_db_connection()
-
-# Test S3 connection
-def check_s3_connection():
-    try:
-        test_file_name = "test_s3_connection.txt"
-        test_file_content = ContentFile("This is a test file for S3 connection.")
-        default_storage.save(test_file_name, test_file_content)
-        logger.info("S3 connection is successful.")
-    except Exception as e:
-        logger.error(f"S3 connection failed: {e}")
-
-check_s3_connection()
+# Write throttling (tracker.throttling). The number of proxies in front of the
+# app that append to X-Forwarded-For; the entry they added is the client address.
+THROTTLE_PROXY_COUNT = int(os.getenv('THROTTLE_PROXY_COUNT', 1))
 
 # CORS configuration
 CORS_ALLOW_ALL_ORIGINS = False  # For development only, restrict this in production
@@ -0,0 +1,92 @@
+"""Compare per-request reconnects with pooled/persistent connections.
+
+Simulates one gunicorn worker from ``gunicorn.conf.py``: ``threads`` threads
+each serve ``--requests`` requests that run a single query, with Django's
+request-start/finish connection handling around every request. The
+``reconnect`` mode also closes the connection at the start of each request,
+as the old ThreadLocalMiddleware did.
+
+    DJANGO_SETTINGS_MODULE=admissions_tracker.settings.production python benchmarks/db_connect.py
+"""
+import argparse
+import os
+import runpy
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admissions_tracker.settings.local')
+os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+
+
+def configure_aliases():
+    from django.conf import settings
+
+    default = settings.DATABASES['default']
+    direct = {**default, 'CONN_MAX_AGE': 0, 'OPTIONS': {k: v for k, v in default.get('OPTIONS', {}).items() if k != 'pool'}}
+    reused = dict(default)
+    if 'pool' not in default.get('OPTIONS', {}):
+        reused.update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    settings.DATABASES['bench_reconnect'] = direct
+    settings.DATABASES['bench_reused'] = reused
+
+
+def serve(alias, requests, close_first, timings):
+    from django.db import connections
+
+    connection = connections[alias]
+    for _ in range(requests):
+        start = time.perf_counter()
+        if close_first:
+            connection.close()
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        connection.close_if_unusable_or_obsolete()
+        timings.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run(alias, threads, requests, close_first):
+    timings = []
+    workers = [threading.Thread(target=serve, args=(alias, requests, close_first, timings)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, sorted(timings)
+
+
+def main():
+    layout = runpy.run_path(str(ROOT / 'gunicorn.conf.py'))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=layout['threads'])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per thread.')
+    args = parser.parse_args()
+
+    import django
+    configure_aliases()
+    django.setup()
+    from django.conf import settings
+
+    print(f"{settings.DATABASES['default']['ENGINE']}: {layout['workers']} workers x {args.threads} threads "
+          f"(measuring one worker), {args.requests} requests per thread")
+    results = {}
+    for label, alias, close_first in [('reconnect', 'bench_reconnect', True), ('reused', 'bench_reused', False)]:
+        elapsed, timings = run(alias, args.threads, args.requests, close_first)
+        results[label] = statistics.mean(timings)
+        print(f"{label:>10}: mean {results[label] * 1000:.3f} ms  "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1000:.3f} ms  "
+              f"{len(timings) / elapsed:.0f} req/s")
+    saved = results['reconnect'] - results['reused']
+    print(f"Connection reuse saves {saved * 1000:.3f} ms per request ({results['reconnect'] / results['reused']:.1f}x).")
+
+
+if __name__ == '__main__':
+    main()
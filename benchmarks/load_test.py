@@ -0,0 +1,111 @@
+"""Compare throughput and latency of the WSGI (gthread) and ASGI (uvicorn) server modes.
+
+Starts gunicorn from ``gunicorn.conf.py`` once per mode with a single worker,
+so results read as "per core", and drives the read endpoints at increasing
+concurrency with a small asyncio HTTP client (stdlib only). Run it against a
+database that has data, e.g. after ``manage.py import_posts``:
+
+    python benchmarks/load_test.py --post-id 1 --concurrency 1 10 50 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def drive(host, port, paths, concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await fetch(host, port, paths[i % len(paths)])
+            except OSError:
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+            i += 1
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return sorted(latencies), errors
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if asyncio.run(fetch(host, port, '/healthz/')) in (200, 503):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'Server on port {port} did not come up.')
+
+
+def run_mode(mode, args, paths):
+    env = {
+        **os.environ,
+        'SERVER_MODE': mode,
+        'GUNICORN_WORKERS': '1',
+        'PORT': str(args.port),
+        'DJANGO_SETTINGS_MODULE': args.settings,
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_until_up('127.0.0.1', args.port)
+        for concurrency in args.concurrency:
+            latencies, errors = asyncio.run(drive('127.0.0.1', args.port, paths, concurrency, args.duration))
+            if not latencies:
+                print(f"{mode:>5} c={concurrency:<4} no successful requests ({errors} errors)")
+                continue
+            print(f"{mode:>5} c={concurrency:<4} {len(latencies) / args.duration:8.1f} req/s  "
+                  f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms  errors {errors}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--settings', default='admissions_tracker.settings.local')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--post-id', type=int, default=1, help='Post whose comments are requested.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level.')
+    parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    args = parser.parse_args()
+
+    paths = ['/api/timeline/', f'/api/comments/{args.post_id}/', '/api/timeline/?sort=-test_score']
+    for mode in args.modes:
+        run_mode(mode, args, paths)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Check every tracker route's query count and latency at 10, 1k and 10k posts.
+
+Runs ``tracker.query_budget`` against a throwaway test database (the same one
+``manage.py test`` would create), prints a table of status, queries and median
+time per route and scale, and exits non-zero if any route's queries grow with
+the data or its time passed the recorded baseline. Record a new baseline on a
+quiet machine with ``--record``:
+
+    python benchmarks/query_budget.py --record
+    python benchmarks/query_budget.py --scales 10 1000 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admissions_tracker.settings.local')
+os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+
+BASELINE = ROOT / 'benchmarks' / 'query_budget_baseline.json'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per route; the median time is kept.')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--record', action='store_true', help='Write the measured times as the new baseline.')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from tracker import query_budget
+
+    missing = query_budget.uncovered_routes()
+    if missing:
+        sys.exit(f"Routes without a budget case: {', '.join(missing)}")
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        results = query_budget.run_budget(
+            args.scales, repeat=args.repeat, progress=lambda scale: print(f'Measured {scale} posts.', file=sys.stderr)
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    baseline = None
+    if args.record:
+        args.baseline.write_text(json.dumps(query_budget.baseline_from(results), indent=2) + '\n')
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    problems = query_budget.scaling_problems(results, baseline)
+    print(query_budget.report(results, problems))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
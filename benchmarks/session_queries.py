@@ -0,0 +1,81 @@
+"""Count database round trips per signed-in timeline view for each session engine.
+
+Seeds a throwaway test database with ``tracker.query_budget.seed``, signs a
+client in under each ``SESSION_ENGINE`` and requests the timeline
+``--requests`` times, reporting queries that touch ``django_session``, total
+queries and mean latency per request.
+
+    python benchmarks/session_queries.py --requests 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admissions_tracker.settings.local')
+os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def measure(engine, user, requests):
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    with override_settings(SESSION_ENGINE=engine):
+        client = Client()
+        client.force_login(user)
+        url = reverse('admission_timeline')
+        client.get(url)
+        timings, session_queries, total_queries = [], 0, 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                client.get(url)
+                timings.append(time.perf_counter() - start)
+            total_queries += len(queries)
+            session_queries += sum('django_session' in query['sql'] for query in queries)
+    return session_queries / requests, total_queries / requests, statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=1000)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from tracker import query_budget
+    from tracker.models import User
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        query_budget.seed(args.posts)
+        user = User.objects.get(username='budget-user0')
+        print(f"{'engine':>15} {'session queries':>16} {'total queries':>14} {'mean':>10}")
+        for label, engine in ENGINES.items():
+            session, total, mean = measure(engine, user, args.requests)
+            print(f"{label:>15} {session:>16.2f} {total:>14.2f} {mean * 1000:>8.2f}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Measure how long a gunicorn worker takes to load the WSGI application.
+
+Each run starts a fresh interpreter and imports ``admissions_tracker.wsgi``,
+which is what every worker does on boot (gunicorn does not preload the app).
+Point ``--root`` at another checkout to compare two versions of the settings.
+
+    python benchmarks/worker_boot.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BOOT = """
+import time
+start = time.perf_counter()
+import admissions_tracker.wsgi
+print(time.perf_counter() - start)
+"""
+
+# Enough configuration for the production settings to import without a .env file.
+DEFAULT_ENV = {
+    'DJANGO_SECRET_KEY': 'benchmark',
+    'DB_NAME': 'admissions_tracker',
+    'DB_HOST': '127.0.0.1',
+    'DB_PORT': '5432',
+    'AWS_STORAGE_BUCKET_NAME': 'benchmark',
+    'AWS_S3_REGION_NAME': 'us-east-1',
+    'EMAIL_PORT': '587',
+}
+
+
+def boot(root, settings):
+    env = {**DEFAULT_ENV, **os.environ, 'DJANGO_SETTINGS_MODULE': settings}
+    result = subprocess.run([sys.executable, '-c', BOOT], cwd=root, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--settings', default='admissions_tracker.settings.production')
+    parser.add_argument('--root', type=Path, default=ROOT)
+    args = parser.parse_args()
+
+    timings = sorted(boot(args.root, args.settings) for _ in range(args.runs))
+    print(f"{args.settings} from {args.root}: {args.runs} boots")
+    print(f"  mean {statistics.mean(timings) * 1000:.1f} ms  median {statistics.median(timings) * 1000:.1f} ms  "
+          f"max {timings[-1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,28 @@
 import multiprocessing
+import os
+import shutil
 
-workers = multiprocessing.cpu_count() * 2 + 1
-threads = 2
-worker_class = 'sync'
-worker_connections = 1000
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 2))
 timeout = 120
-keepalive = 5
\ No newline at end of file
+keepalive = 5
+
+# SERVER_MODE=asgi serves admissions_tracker/asgi.py on uvicorn workers: one event
+# loop per worker, so open SSE streams and slow clients no longer each pin a thread.
+# `threads` does not apply here; the settings size each worker's database pool
+# for concurrent requests instead (DB_POOL_MAX_SIZE, 10 by default).
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'admissions_tracker.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'admissions_tracker.wsgi:application'
+    worker_class = 'gthread'
+
+# Each worker writes its request metrics here for /metrics to merge.
+os.environ.setdefault('METRICS_DIR', '/tmp/admissions_tracker_metrics')
+
+
+def on_starting(server):
+    # Counters from a previous run would otherwise be added to the new ones.
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -22,95 +22,120 @@ document.addEventListener('DOMContentLoaded', function() {
         document.getElementById('filters-container').style.display = 'none';
     });
 
+    // Pages served from the shared cache carry no CSRF token; take it from the cookie instead
+    document.addEventListener('submit', function(e) {
+        const form = e.target;
+        if (form.method.toLowerCase() !== 'post' || form.querySelector('[name="csrfmiddlewaretoken"]')) {
+            return;
+        }
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'csrfmiddlewaretoken';
+        input.value = getCookie('csrftoken');
+        form.appendChild(input);
+    });
+
     // Handling clicks on the like button
-    document.querySelectorAll('.like-btn').forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const postId = this.dataset.postId;
-            const isAuthenticated = this.dataset.authenticated === 'true';
-
-            if (!isAuthenticated) {
-                if (confirm('You need to log in to like this post. Go to login page?')) {
-                    window.location.href = `/accounts/login/?next=${encodeURIComponent(window.location.pathname)}`;
-                }
-                return;
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.like-btn');
+        if (!button) {
+            return;
+        }
+        e.preventDefault();
+        const postId = button.dataset.postId;
+        const isAuthenticated = button.dataset.authenticated === 'true';
+
+        if (!isAuthenticated) {
+            if (confirm('You need to log in to like this post. Go to login page?')) {
+                window.location.href = `/accounts/login/?next=${encodeURIComponent(window.location.pathname)}`;
             }
+            return;
+        }
 
-            fetch(`/api/like/${postId}/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': getCookie('csrftoken'),
-                    'Content-Type': 'application/json',
-                },
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    this.textContent = `Like (${data.likes_count})`;
-                    this.classList.toggle('liked', data.liked);
-                }
-            })
-            .catch(error => console.error('Error:', error));
-        });
+        fetch(`/api/like/${postId}/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({liked: !button.classList.contains('liked')}),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                button.textContent = `Like (${data.likes_count})`;
+                button.classList.toggle('liked', data.liked);
+            } else if (data.error) {
+                alert(data.error);
+            }
+        })
+        .catch(error => console.error('Error:', error));
     });
 
     // Handling clicks on the comment button
-    document.querySelectorAll('.comment-btn').forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const postId = this.dataset.postId;
-            const commentsSection = document.querySelector(`.comments-section[data-post-id="${postId}"]`);
-            toggleElement(commentsSection);
-        });
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.comment-btn');
+        if (!button) {
+            return;
+        }
+        e.preventDefault();
+        const postId = button.dataset.postId;
+        const commentsSection = document.querySelector(`.comments-section[data-post-id="${postId}"]`);
+        toggleElement(commentsSection);
     });
 
     // Handling comment form submission
-    document.querySelectorAll('.comment-form').forEach(form => {
-        form.addEventListener('submit', function(e) {
-            e.preventDefault();
-            const postId = this.dataset.postId;
-            const content = this.querySelector('textarea[name="content"]').value;
-
-            fetch(`/api/comment/${postId}/`, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': getCookie('csrftoken'),
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ content: content }),
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    const commentsList = this.closest('.comments-section').querySelector('.comments-list');
-                    const newComment = document.createElement('div');
-                    newComment.className = 'comment';
-                    newComment.innerHTML = `
-                        <strong>${data.comment_user}</strong> (${data.comment_date}):
-                        ${data.comment_content}
-                        <button class="btn btn-sm btn-danger delete-comment float-right" data-comment-id="${data.comment_id}">
-                            <i class="fas fa-trash-alt"></i>
-                        </button>
-                    `;
-                    commentsList.appendChild(newComment);
-                    this.reset();
-                    
-                    // Update comment count
-                    const commentBtn = document.querySelector(`.comment-btn[data-post-id="${postId}"]`);
-                    const currentCount = parseInt(commentBtn.textContent.match(/\d+/)[0]);
-                    commentBtn.textContent = `Comments (${currentCount + 1})`;
-
-                    // Add event listener for the new delete button
-                    newComment.querySelector('.delete-comment').addEventListener('click', deleteComment);
-                }
-            })
-            .catch(error => console.error('Error:', error));
-        });
+    document.addEventListener('submit', function(e) {
+        const form = e.target.closest('.comment-form');
+        if (!form) {
+            return;
+        }
+        e.preventDefault();
+        const postId = form.dataset.postId;
+        const content = form.querySelector('textarea[name="content"]').value;
+
+        fetch(`/api/comment/${postId}/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ content: content }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                const commentsList = form.closest('.comments-section').querySelector('.comments-list');
+                const newComment = document.createElement('div');
+                newComment.className = 'comment';
+                newComment.innerHTML = `
+                    <strong>${data.comment_user}</strong> (${data.comment_date}):
+                    ${data.comment_content}
+                    <button class="btn btn-sm btn-danger delete-comment float-right" data-comment-id="${data.comment_id}">
+                        <i class="fas fa-trash-alt"></i>
+                    </button>
+                `;
+                commentsList.appendChild(newComment);
+                form.reset();
+
+                // Update comment count
+                const commentBtn = document.querySelector(`.comment-btn[data-post-id="${postId}"]`);
+                const currentCount = parseInt(commentBtn.textContent.match(/\d+/)[0]);
+                commentBtn.textContent = `Comments (${currentCount + 1})`;
+            } else if (data.error) {
+                alert(data.error);
+            }
+        })
+        .catch(error => console.error('Error:', error));
     });
 
     // Function to delete a comment
     function deleteComment(e) {
-        const commentId = e.target.closest('.delete-comment').dataset.commentId;
+        const button = e.target.closest('.delete-comment');
+        if (!button) {
+            return;
+        }
+        const commentId = button.dataset.commentId;
         fetch(`/api/delete_comment/${commentId}/`, {
             method: 'POST',
             headers: {
@@ -121,7 +146,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                e.target.closest('.comment').remove();
+                button.closest('.comment').remove();
                 // Update comment count
                 const commentBtn = document.querySelector(`.comment-btn[data-post-id="${data.post_id}"]`);
                 const currentCount = parseInt(commentBtn.textContent.match(/\d+/)[0]);
@@ -131,10 +156,67 @@ document.addEventListener('DOMContentLoaded', function() {
         .catch(error => console.error('Error:', error));
     }
 
-    // Add event listeners for existing delete buttons
-    document.querySelectorAll('.delete-comment').forEach(button => {
-        button.addEventListener('click', deleteComment);
-    });
+    // Delete buttons, including those on posts loaded later
+    document.addEventListener('click', deleteComment);
+
+    // Infinite scroll: fetch the next page of posts when the sentinel comes into view
+    const sentinel = document.getElementById('timeline-sentinel');
+    let loadingPage = false;
+
+    function loadNextPage() {
+        const cursor = sentinel.dataset.nextCursor;
+        if (!cursor || loadingPage) {
+            return;
+        }
+        loadingPage = true;
+        const params = new URLSearchParams({ cursor: cursor, sort: sentinel.dataset.sort });
+        fetch(`/api/timeline/?${params}`, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        })
+        .then(response => response.json())
+        .then(data => {
+            document.querySelector('.timeline').insertAdjacentHTML('beforeend', data.html);
+            sentinel.dataset.nextCursor = data.next_cursor || '';
+        })
+        .catch(error => console.error('Error:', error))
+        .finally(() => {
+            loadingPage = false;
+        });
+    }
+
+    if (sentinel && 'IntersectionObserver' in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }, { rootMargin: '400px' }).observe(sentinel);
+    }
+
+    // Live updates: announce new posts and keep comment counts current without reloading
+    const newPostsBanner = document.getElementById('new-posts-banner');
+    let newPosts = 0;
+
+    if (newPostsBanner && 'EventSource' in window) {
+        const events = new EventSource('/api/live/');
+
+        events.addEventListener('post', function() {
+            newPosts += 1;
+            newPostsBanner.textContent = `${newPosts} new post${newPosts === 1 ? '' : 's'} - click to show`;
+            newPostsBanner.style.display = 'block';
+        });
+
+        events.addEventListener('comment', function(e) {
+            const data = JSON.parse(e.data);
+            const commentBtn = document.querySelector(`.comment-btn[data-post-id="${data.post_id}"]`);
+            if (commentBtn) {
+                commentBtn.textContent = `Comments (${data.comment_count})`;
+            }
+        });
+
+        newPostsBanner.addEventListener('click', function() {
+            window.location.reload();
+        });
+    }
 
     // Function to get CSRF token
     function getCookie(name) {
@@ -0,0 +1,109 @@
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Count
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from .forms import AdmissionPostImportUploadForm
+from .importers import import_posts
+from .models import AdmissionPost, Major, MajorAlias, OutboundEmail, University, UniversityAlias
+from .names import merge_names, normalize_name
+
+MAX_REPORTED_IMPORT_ERRORS = 50
+
+
+@admin.register(AdmissionPost)
+class AdmissionPostAdmin(admin.ModelAdmin):
+    list_display = ('university', 'major', 'degree_type', 'status', 'year', 'term', 'created_at')
+    list_filter = ('degree_type', 'status', 'year', 'term')
+    search_fields = ('university', 'major')
+    change_list_template = 'admin/tracker/admissionpost/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='tracker_admissionpost_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:tracker_admissionpost_changelist')
+
+        form = AdmissionPostImportUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            errors = []
+
+            def report(line_number, row_errors):
+                if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                    errors.append(f"Line {line_number}: " + '; '.join(
+                        f"{field}: {' '.join(field_messages)}" for field, field_messages in row_errors.items()
+                    ))
+
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = import_posts(stream, form.cleaned_data['format'], on_error=report)
+            messages.success(request, f"Imported {result.created} of {result.processed} rows.")
+            if result.failed:
+                messages.warning(request, f"{result.failed} rows were rejected.")
+            for error in errors:
+                messages.error(request, error)
+            return redirect(reverse('admin:tracker_admissionpost_changelist'))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import admission results',
+        }
+        return TemplateResponse(request, 'admin/tracker/admissionpost/import.html', context)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.action(description='Merge selected into the one with the most posts')
+def merge_selected(modeladmin, request, queryset):
+    entities = list(queryset.annotate(post_count=Count('posts')).order_by('-post_count', 'pk'))
+    if len(entities) < 2:
+        modeladmin.message_user(request, 'Select at least two to merge.', messages.WARNING)
+        return
+    merged = merge_names(entities[0], entities[1:])
+    modeladmin.message_user(request, f'Merged {merged} into {entities[0]}.')
+
+
+class AliasForm(forms.ModelForm):
+    def clean_alias(self):
+        return normalize_name(self.cleaned_data['alias'])
+
+
+class UniversityAliasInline(admin.TabularInline):
+    model = UniversityAlias
+    form = AliasForm
+    extra = 0
+
+
+class MajorAliasInline(admin.TabularInline):
+    model = MajorAlias
+    form = AliasForm
+    extra = 0
+
+
+@admin.register(University)
+class UniversityAdmin(admin.ModelAdmin):
+    search_fields = ('name', 'aliases__alias')
+    inlines = [UniversityAliasInline]
+    actions = [merge_selected]
+
+
+@admin.register(Major)
+class MajorAdmin(admin.ModelAdmin):
+    search_fields = ('name', 'aliases__alias')
+    inlines = [MajorAliasInline]
+    actions = [merge_selected]
@@ -0,0 +1,103 @@
+import numpy as np
+
+from .caching import get_or_build
+from .models import AdmissionPost
+from .stats import stats_filters, stats_params
+
+ANALYTICS_COLUMNS = ('year', 'status', 'gpa', 'gpa_scale', 'test_type', 'test_score')
+OUTCOMES = ('admissions', 'rejections')
+PERCENTILES = [10, 25, 50, 75, 90]
+GPA_BINS = np.linspace(0.0, 4.0, 17)
+# Test types with fewer scored posts than this are left out of the distributions.
+MIN_TEST_SAMPLES = 5
+
+
+def analytics_queryset(params):
+    return AdmissionPost.objects.filter(**stats_filters(params)).order_by().values_list(*ANALYTICS_COLUMNS)
+
+
+def load_columns(params):
+    """Pull the analytics columns for the filtered posts in one query, as NumPy arrays."""
+    rows = analytics_queryset(params)
+    columns = dict(zip(ANALYTICS_COLUMNS, zip(*rows))) or {name: () for name in ANALYTICS_COLUMNS}
+    status = np.array(columns['status'], dtype=str)
+    gpa = np.array(columns['gpa'], dtype=float)
+    gpa_scale = np.array(columns['gpa_scale'], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gpa = np.where(gpa_scale > 0, gpa / gpa_scale * 4.0, np.nan)
+    return {
+        'year': np.array(columns['year'], dtype=int),
+        'admitted': np.isin(status, AdmissionPost.STATUS_GROUPS['admissions']),
+        'rejected': np.isin(status, AdmissionPost.STATUS_GROUPS['rejections']),
+        'gpa': gpa,
+        'test_type': np.char.upper(np.char.strip(np.array([t or '' for t in columns['test_type']], dtype=str))),
+        'test_score': np.array(columns['test_score'], dtype=float),
+    }
+
+
+def _rate(admitted, rejected):
+    decided = admitted + rejected
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(decided > 0, admitted / decided, np.nan)
+    return rates
+
+
+def _rounded(values, digits=4):
+    return [None if np.isnan(value) else round(float(value), digits) for value in np.atleast_1d(values)]
+
+
+def distribution(values, bins=None):
+    values = values[~np.isnan(values)]
+    summary = {'count': int(values.size)}
+    if values.size:
+        summary['mean'] = _rounded(values.mean())[0]
+        summary['percentiles'] = dict(zip(map(str, PERCENTILES), _rounded(np.percentile(values, PERCENTILES))))
+    if bins is not None:
+        summary['histogram'] = np.histogram(values, bins=bins)[0].tolist()
+    return summary
+
+
+def yearly_trend(columns):
+    years, index = np.unique(columns['year'], return_inverse=True)
+    admitted = np.bincount(index, weights=columns['admitted'], minlength=years.size)
+    rejected = np.bincount(index, weights=columns['rejected'], minlength=years.size)
+    rates = _rate(admitted, rejected)
+    return {
+        'years': years.tolist(),
+        'admissions': admitted.astype(int).tolist(),
+        'rejections': rejected.astype(int).tolist(),
+        'acceptance_rate': _rounded(rates),
+        'rate_change': [None] + _rounded(np.diff(rates)) if years.size else [],
+    }
+
+
+def compute_analytics(columns):
+    admitted, rejected = columns['admitted'], columns['rejected']
+    outcome_masks = dict(zip(OUTCOMES, (admitted, rejected)))
+    test_scores = {}
+    scored = ~np.isnan(columns['test_score']) & (columns['test_type'] != '')
+    test_types, counts = np.unique(columns['test_type'][scored], return_counts=True)
+    for test_type in test_types[counts >= MIN_TEST_SAMPLES]:
+        of_type = columns['test_type'] == test_type
+        test_scores[str(test_type)] = {
+            outcome: distribution(columns['test_score'][of_type & mask]) for outcome, mask in outcome_masks.items()
+        }
+    return {
+        'total': int(admitted.size),
+        'admissions': int(admitted.sum()),
+        'rejections': int(rejected.sum()),
+        'acceptance_rate': _rounded(_rate(admitted.sum(), rejected.sum()))[0],
+        'trend': yearly_trend(columns),
+        'gpa': {
+            'bins': GPA_BINS.tolist(),
+            **{outcome: distribution(columns['gpa'][mask], GPA_BINS) for outcome, mask in outcome_masks.items()},
+        },
+        'test_scores': test_scores,
+    }
+
+
+def admission_analytics(params):
+    """Acceptance rates, score distributions and yearly trends for the stats filters, cached until posts change."""
+    # The status group does not narrow the analytics, so it stays out of the key.
+    key = tuple(item for item in stats_params(params) if item[0] != 'count_type')
+    return get_or_build('analytics', ['posts'], lambda: compute_analytics(load_columns(dict(key))), key)
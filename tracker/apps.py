@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 class TrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'tracker'
\ No newline at end of file
+    name = 'tracker'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import instrument_connection, instrument_templates
+        from .search import ensure_search_schema
+        post_migrate.connect(ensure_search_schema, sender=self)
+        connection_created.connect(instrument_connection)
+        instrument_templates()
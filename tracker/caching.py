@@ -0,0 +1,152 @@
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .metrics import record_cache
+from .replicas import REPLICA_STICKY_SECONDS, STICKY_COOKIE, primary_reads, reading_replica
+
+VERSION_KEY = 'tracker:version:{}'
+MODIFIED_KEY = 'tracker:modified:{}'
+
+
+def _initial_version():
+    # Seeded from the clock so an evicted counter never restarts at a
+    # number that older cache entries were stored under.
+    return time.time_ns()
+
+
+def get_versions(*names):
+    """Return the current version of each named data set, in order."""
+    keys = [VERSION_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return versions
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+    cache.set(MODIFIED_KEY.format(name), int(time.time()), timeout=None)
+
+
+def bump_version_on_commit(name):
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def versioned_key(prefix, depends_on, *parts):
+    """Build a cache key that changes whenever any data set in ``depends_on`` is bumped."""
+    versions = '.'.join(str(version) for version in get_versions(*depends_on))
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'tracker:{prefix}:{versions}:{digest}'
+
+
+def get_or_build(prefix, depends_on, build, *parts, timeout=3600):
+    key = versioned_key(prefix, depends_on, *parts)
+    value = cache.get(key)
+    record_cache(prefix, value is not None)
+    if value is None:
+        with _fresh_reads(depends_on):
+            value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _fresh_reads(depends_on, last_modified=None):
+    """Where to read when building an entry under the current versions of ``depends_on``.
+
+    A replica may not have the write that bumped them yet, and the entry would
+    outlive the lag, so for ``REPLICA_STICKY_SECONDS`` after it reads go to the
+    primary.
+    """
+    if reading_replica():
+        if last_modified is None:
+            last_modified = get_last_modified(*depends_on)
+        # A second more, as the modification time is rounded down.
+        if time.time() - last_modified < getattr(settings, 'REPLICA_STICKY_SECONDS', REPLICA_STICKY_SECONDS) + 1:
+            return primary_reads()
+    return nullcontext()
+
+
+RESPONSE_CACHE_TIMEOUT = 600
+
+
+def get_last_modified(*names):
+    """Return when any data set in ``names`` last changed, as a Unix timestamp.
+
+    Recorded by ``bump_version`` at commit time, so deletions move it too. A
+    data set with no record yet counts as changed now.
+    """
+    keys = [MODIFIED_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    now = int(time.time())
+    for key in keys:
+        if key not in found:
+            cache.add(key, now, timeout=None)
+            found[key] = cache.get(key, now)
+    return max(found.values())
+
+
+def cache_anonymous_response(prefix, depends_on, timeout=RESPONSE_CACHE_TIMEOUT):
+    """Serve GET requests from anonymous visitors out of the shared cache.
+
+    Entries are keyed on the path, the normalized query string and the versions
+    of ``depends_on``, so a write to one of those data sets retires exactly the
+    pages built from it. Responses carry an ETag and Last-Modified, and a
+    matching conditional request gets a 304 without running the view. Cached
+    pages leave out the CSRF token; main.js adds it from the cookie on submit.
+    Visitors who just wrote bypass the cache, and pages are built from the
+    primary until the replicas can be expected to have the latest write.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                    or STICKY_COOKIE in request.COOKIES or len(get_messages(request))):
+                return view(request, *args, **kwargs)
+
+            query = sorted(request.GET.lists())
+            key = versioned_key(f'response:{prefix}', depends_on, request.path, query)
+            etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+            last_modified = get_last_modified(*depends_on)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                cached = cache.get(key)
+                record_cache(f'response:{prefix}', cached is not None)
+                if cached is not None:
+                    response = HttpResponse(cached[0], content_type=cached[1])
+                else:
+                    with _fresh_reads(depends_on, last_modified):
+                        response = view(request, *args, **kwargs)
+                        # Only unrendered template responses can have the CSRF token left out.
+                        if response.status_code != 200 or not hasattr(response, 'render'):
+                            return response
+                        response.context_data['csrf_token'] = 'NOTPROVIDED'
+                        response.render()
+                    cache.set(key, (response.content, response['Content-Type']), timeout)
+                # The shared page has no token, so make sure this visitor has the cookie.
+                get_token(request)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
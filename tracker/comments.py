@@ -0,0 +1,50 @@
+from .models import Comment
+from .pagination import akeyset_page, keyset_page
+
+COMMENT_PAGE_SIZE = 50
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'user': comment.user.get_display_name(),
+        'content': comment.content,
+        'created_at': comment.created_at.strftime("%B %d, %Y %I:%M %p"),
+        'replies': [],
+    }
+
+
+def _thread_querysets(post_id):
+    top_level = Comment.objects.filter(post_id=post_id, parent__isnull=True).select_related('user')
+    replies = Comment.objects.select_related('user').order_by('created_at', 'id')
+    return top_level, replies
+
+
+def _build_tree(roots, replies):
+    nodes = {comment.id: serialize_comment(comment) for comment in roots}
+    for reply in replies:
+        nodes[reply.id] = serialize_comment(reply)
+    # A reply always comes after its parent, so the parent's node already exists.
+    for reply in replies:
+        nodes[reply.parent_id]['replies'].append(nodes[reply.id])
+    return [nodes[comment.id] for comment in roots]
+
+
+def comment_tree(post_id, cursor=None, page_size=COMMENT_PAGE_SIZE):
+    """Return ``(threads, next_cursor)`` for one page of a post's top-level comments.
+
+    Each thread is a nested dict with its replies, to any depth, in posting
+    order. The page takes two queries however long or deep the threads are.
+    """
+    top_level, replies = _thread_querysets(post_id)
+    roots, next_cursor = keyset_page(top_level, 'created_at', cursor, page_size)
+    replies = list(replies.filter(root__in=roots)) if roots else []
+    return _build_tree(roots, replies), next_cursor
+
+
+async def acomment_tree(post_id, cursor=None, page_size=COMMENT_PAGE_SIZE):
+    """Async version of ``comment_tree``."""
+    top_level, replies = _thread_querysets(post_id)
+    roots, next_cursor = await akeyset_page(top_level, 'created_at', cursor, page_size)
+    replies = [reply async for reply in replies.filter(root__in=roots)] if roots else []
+    return _build_tree(roots, replies), next_cursor
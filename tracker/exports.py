@@ -0,0 +1,182 @@
+import csv
+
+from asgiref.sync import sync_to_async
+
+from .models import AdmissionPost, AdmissionStatsRollup, Major, University
+from .replicas import resume_on_primary
+from .stats import COUNTER_FIELDS, StatsFilterError, filter_posts, stats_queryset, stats_rows
+
+EXPORT_KINDS = ('posts', 'stats')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+# Contact details and the posting user stay out of exports.
+POST_EXPORT_FIELDS = [
+    'id', 'created_at', 'university', 'major', 'degree_type', 'year', 'term', 'status', 'country',
+    'application_round', 'student_type', 'gpa', 'gpa_scale', 'test_type', 'test_score', 'continent',
+    'state', 'financial_aid', 'scholarship', 'post_grad_plans', 'notes',
+]
+# One stats row per combination of these.
+STATS_GROUP_FIELDS = ['university', 'major', 'degree_type', 'year', 'term']
+STATS_EXPORT_FIELDS = STATS_GROUP_FIELDS + COUNTER_FIELDS
+# Stats rows carry the canonical names rather than the rollup's foreign keys.
+STATS_NAME_FIELDS = {'university': University._meta.get_field('name'), 'major': Major._meta.get_field('name')}
+
+
+class ExportError(Exception):
+    pass
+
+
+def export_columns(kind):
+    """Return ``(name, model field)`` for each column of the export."""
+    if kind == 'posts':
+        return [(name, AdmissionPost._meta.get_field(name)) for name in POST_EXPORT_FIELDS]
+    return [
+        (name, STATS_NAME_FIELDS.get(name) or AdmissionStatsRollup._meta.get_field(name))
+        for name in STATS_EXPORT_FIELDS
+    ]
+
+
+def export_queryset(kind, params):
+    """The queryset an export of ``kind`` reads; stats exports post-process its rows in ``stats_rows``."""
+    if kind == 'posts':
+        return filter_posts(params).order_by('id').values_list(*POST_EXPORT_FIELDS)
+    return stats_queryset(params)
+
+
+def export_rows(kind, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows as tuples in ``export_columns(kind)`` order, streamed from a server-side cursor.
+
+    If the replica they are read from fails part way, the rest are read from the primary.
+    """
+    if kind == 'posts':
+        queryset = export_queryset(kind, params)
+        # In id order, so the primary picks up after the last post sent.
+        return resume_on_primary(
+            queryset.iterator(chunk_size=chunk_size),
+            lambda last: (queryset if last is None else queryset.filter(id__gt=last[0])).iterator(chunk_size=chunk_size),
+        )
+    # Rollup rows come in no particular order, so the primary skips the groups already sent.
+    sent = set()
+    group_size = len(STATS_GROUP_FIELDS)
+
+    def tuples(rows, skip=frozenset()):
+        for row in rows:
+            row = tuple(row[field] for field in STATS_EXPORT_FIELDS)
+            if row[:group_size] not in skip:
+                sent.add(row[:group_size])
+                yield row
+
+    return resume_on_primary(
+        tuples(stats_rows(params, chunk_size=chunk_size)),
+        lambda last: tuples(stats_rows(params, chunk_size=chunk_size), frozenset(sent)),
+    )
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_chunks(columns, rows, rows_per_chunk=500):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, field in columns])
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= rows_per_chunk:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(columns, rows, rows_per_group=EXPORT_CHUNK_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs the optional pyarrow package.")
+
+    arrow_types = {
+        'BigAutoField': pa.int64(),
+        'IntegerField': pa.int64(),
+        'FloatField': pa.float64(),
+        'BooleanField': pa.bool_(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    schema = pa.schema([
+        (name, arrow_types.get(field.get_internal_type(), pa.string())) for name, field in columns
+    ])
+
+    def to_table(batch):
+        values = zip(*batch)
+        return pa.Table.from_arrays([pa.array(column, type=type) for column, type in zip(values, schema.types)], schema=schema)
+
+    def generate():
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= rows_per_group:
+                    writer.write_table(to_table(batch))
+                    batch = []
+                    yield sink.drain()
+            if batch:
+                writer.write_table(to_table(batch))
+        yield sink.drain()
+
+    return generate()
+
+
+def export_chunks(kind, fmt, params):
+    if kind not in EXPORT_KINDS:
+        raise ExportError(f"Unknown export: {kind}")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format: {fmt}")
+    columns = export_columns(kind)
+    try:
+        rows = export_rows(kind, params)
+    except StatsFilterError as e:
+        raise ExportError(str(e))
+    if fmt == 'parquet':
+        return parquet_chunks(columns, rows)
+    return csv_chunks(columns, rows)
+
+
+async def async_chunks(chunks):
+    """Iterate ``chunks`` from an async response, one chunk per trip to the request's database thread.
+
+    Under ASGI Django collects a sync iterator into a list before sending any
+    of it, which would hold a whole export in memory.
+    """
+    chunks = iter(chunks)
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
@@ -1,4 +1,5 @@
 from django import forms
+from django.utils import timezone
 from .models import AdmissionPost, Comment, User
 from django.contrib.auth.forms import UserCreationForm
 
@@ -72,4 +73,35 @@ class UserSettingsForm(forms.ModelForm):
             'username': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'anonymous_username': forms.TextInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+class AdmissionPostImportForm(forms.ModelForm):
+    """Validates one historical result row for the bulk importer."""
+
+    class Meta:
+        model = AdmissionPost
+        fields = [
+            'degree_type', 'major', 'university', 'country', 'application_round', 'status', 'notification_method',
+            'year', 'term', 'gpa', 'gpa_scale', 'test_type', 'test_score', 'student_type', 'continent', 'state',
+            'financial_aid', 'scholarship', 'post_grad_plans', 'notes', 'created_at',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in ('application_round', 'notification_method', 'year', 'term', 'gpa_scale', 'created_at'):
+            self.fields[name].required = False
+
+    def clean_year(self):
+        return self.cleaned_data.get('year') or AdmissionPost._meta.get_field('year').default
+
+    def clean_term(self):
+        return self.cleaned_data.get('term') or AdmissionPost._meta.get_field('term').default
+
+    def clean_gpa_scale(self):
+        return self.cleaned_data.get('gpa_scale') or AdmissionPost._meta.get_field('gpa_scale').default
+
+    def clean_created_at(self):
+        return self.cleaned_data.get('created_at') or timezone.now()
+
+class AdmissionPostImportUploadForm(forms.Form):
+    file = forms.FileField(help_text="A CSV file with a header row, or JSON Lines with one object per line.")
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')])
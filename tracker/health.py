@@ -0,0 +1,75 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+READINESS_CACHE_KEY = 'health:readiness'
+READINESS_TTL = 30
+
+
+def check_database():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_storage():
+    # A read-only probe: one HEAD/stat request, nothing is written to the bucket.
+    default_storage.exists('healthz')
+
+
+READINESS_CHECKS = {
+    'database': check_database,
+    'storage': check_storage,
+}
+# Failing these degrades uploads but not the rest of the site, so the
+# instance stays in the load balancer: an S3 outage must not take down
+# every instance at once.
+NONCRITICAL_CHECKS = {'storage'}
+
+
+def run_checks(names=None):
+    """Run the readiness checks and return ``{name: {'ok', 'ms'[, 'error']}}``."""
+    results = {}
+    for name in names or READINESS_CHECKS:
+        start = time.perf_counter()
+        try:
+            READINESS_CHECKS[name]()
+        except Exception as e:
+            logger.error("Readiness check %s failed: %s", name, e)
+            results[name] = {'ok': False, 'error': str(e)}
+        else:
+            results[name] = {'ok': True}
+        results[name]['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return results
+
+
+def checks_ok(checks):
+    return all(check['ok'] for name, check in checks.items() if name not in NONCRITICAL_CHECKS)
+
+
+def readiness(refresh=False):
+    """Return the cached readiness report, re-running the checks at most once per TTL."""
+    report = None if refresh else cache.get(READINESS_CACHE_KEY)
+    if report is None:
+        checks = run_checks()
+        report = {
+            'ok': checks_ok(checks),
+            'checks': checks,
+            'checked_at': time.time(),
+        }
+        cache.set(READINESS_CACHE_KEY, report, getattr(settings, 'READINESS_TTL', READINESS_TTL))
+    return report
+
+
+def public_report(report):
+    """The readiness report without errors or timings, which stay in the logs."""
+    return {
+        'ok': report['ok'],
+        'checks': {name: 'ok' if check['ok'] else 'failing' for name, check in report['checks'].items()},
+    }
@@ -0,0 +1,91 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .caching import bump_version_on_commit
+from .forms import AdmissionPostImportForm
+from .models import AdmissionPost
+from .names import Canonicalizer
+from .stats import add_post_delta, apply_rollup_deltas, new_rollup_deltas, post_values
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+
+    @property
+    def processed(self):
+        return self.created + self.failed
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line number, row dict)`` pairs from a text stream without reading it all."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = e
+            else:
+                if not isinstance(row, dict):
+                    row = ValueError('Expected a JSON object.')
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_posts(stream, fmt='csv', chunk_size=1000, on_error=None):
+    """Validate and insert admission posts from ``stream`` in batched transactions.
+
+    Memory use is bounded by ``chunk_size``. Rows that fail validation are
+    reported to ``on_error(line_number, errors)`` and skipped; each chunk of
+    valid rows is written with ``bulk_create`` together with its stats rollup
+    update.
+    """
+    result = ImportResult()
+    canonicalizer = Canonicalizer()
+    for chunk in chunked(read_rows(stream, fmt), chunk_size):
+        posts = []
+        for line_number, row in chunk:
+            if isinstance(row, ValueError):
+                errors = {'__all__': [str(row)]}
+            else:
+                form = AdmissionPostImportForm(row)
+                if form.is_valid():
+                    posts.append(form.save(commit=False))
+                    continue
+                errors = form.errors.get_json_data()
+                errors = {field: [error['message'] for error in messages] for field, messages in errors.items()}
+            result.failed += 1
+            if on_error:
+                on_error(line_number, errors)
+
+        if posts:
+            # bulk_create skips the save signals, so names and the rollup are handled here.
+            canonicalizer.canonicalize(posts)
+            deltas = new_rollup_deltas()
+            for post in posts:
+                add_post_delta(deltas, post_values(post), 1)
+            with transaction.atomic():
+                AdmissionPost.objects.bulk_create(posts, batch_size=chunk_size)
+                apply_rollup_deltas(deltas)
+                bump_version_on_commit('posts')
+            result.created += len(posts)
+    return result
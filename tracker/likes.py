@@ -0,0 +1,52 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .caching import bump_version_on_commit
+from .models import AdmissionPost
+
+Like = AdmissionPost.likes.through
+
+
+def set_like(post_id, user_id, liked=None):
+    """Like or unlike a post and return ``(liked, likes_count)``.
+
+    ``liked=None`` toggles. Asking for the state the post is already in is a
+    no-op, so a repeated or concurrent request cannot count a like twice; the
+    unique (post, user) constraint on the through table settles races between
+    two inserts.
+    """
+    with transaction.atomic():
+        like = Like.objects.filter(admissionpost_id=post_id, user_id=user_id)
+        if liked is None:
+            liked = not like.exists()
+        if liked:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(admissionpost_id=post_id, user_id=user_id)
+                change = 1
+            except IntegrityError:
+                change = 0
+        else:
+            change = -like.delete()[0]
+        if change:
+            # update() keeps updated_at and the save signals out of a like.
+            AdmissionPost.objects.filter(pk=post_id).update(likes_count=F('likes_count') + change)
+            bump_version_on_commit('likes')
+        likes_count = AdmissionPost.objects.values_list('likes_count', flat=True).get(pk=post_id)
+    return liked, likes_count
+
+
+def recount_likes(post_ids=None):
+    """Recompute ``likes_count`` from the likes table and return how many posts were off."""
+    counts = Like.objects.filter(admissionpost_id=OuterRef('pk')).order_by().values('admissionpost_id').annotate(
+        n=Count('pk')
+    ).values('n')
+    posts = AdmissionPost.objects.annotate(actual=Coalesce(Subquery(counts), 0)).exclude(likes_count=F('actual'))
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    drifted = list(posts.values_list('pk', flat=True))
+    if drifted:
+        AdmissionPost.objects.filter(pk__in=drifted).update(likes_count=Coalesce(Subquery(counts), 0))
+        bump_version_on_commit('likes')
+    return len(drifted)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'tracker_live'
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_INTERVAL = 20
+RECONNECT_DELAY = 5
+# Browsers wait this long (ms) before reconnecting a dropped stream.
+CLIENT_RETRY = 5000
+
+
+class Broker:
+    """Fans live events out to the SSE streams open in this process.
+
+    On PostgreSQL events travel through LISTEN/NOTIFY, so an event published by
+    any process (web worker, management command) reaches every server process,
+    each of which holds a single listening connection however many clients are
+    attached. Other databases fall back to in-process delivery.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.listener = None
+
+    def subscribe(self):
+        self.loop = asyncio.get_running_loop()
+        if connections['default'].vendor == 'postgresql' and (self.listener is None or self.listener.done()):
+            self.listener = self.loop.create_task(self.listen())
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def deliver(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A stalled client misses events rather than holding memory; it resyncs on reload.
+                pass
+
+    def deliver_threadsafe(self, message):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.deliver, message)
+
+    async def listen(self):
+        import psycopg
+
+        settings_dict = connections['default'].settings_dict
+        params = {
+            'dbname': settings_dict['NAME'],
+            'user': settings_dict['USER'],
+            'password': settings_dict['PASSWORD'],
+            'host': settings_dict['HOST'],
+            'port': settings_dict['PORT'],
+        }
+        params = {key: value for key, value in params.items() if value}
+        while self.subscribers:
+            try:
+                async with await psycopg.AsyncConnection.connect(autocommit=True, **params) as conn:
+                    await conn.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                    async for notify in conn.notifies():
+                        self.deliver(json.loads(notify.payload))
+            except Exception as e:
+                logger.warning("Live event listener disconnected: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+broker = Broker()
+
+
+def _send(message):
+    connection = connections['default']
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps(message)])
+    else:
+        broker.deliver_threadsafe(message)
+
+
+def publish(event, data):
+    """Send ``event`` to every open live stream once the current transaction commits."""
+    message = {'event': event, 'data': data}
+    transaction.on_commit(lambda: _send(message))
+
+
+def format_event(message):
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+async def event_stream():
+    queue = broker.subscribe()
+    try:
+        yield f'retry: {CLIENT_RETRY}\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection.
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(message)
+    finally:
+        broker.unsubscribe(queue)
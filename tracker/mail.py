@@ -0,0 +1,162 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.core import signing
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import AdmissionPost, Comment, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(minutes=1)
+# A claimed message becomes due again if its worker dies before reporting back.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Errors that mean the SMTP connection itself is gone, not just this message.
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+DIGEST_CONFIRMATION_SALT = 'tracker.digest-confirmation'
+DIGEST_CONFIRMATION_MAX_AGE = timedelta(days=7)
+
+
+def queue_email(subject, body, recipient):
+    return OutboundEmail.objects.create(subject=subject, body=body, recipient=recipient)
+
+
+def claim_due_email(batch_size=OUTBOX_BATCH_SIZE):
+    """Lease up to ``batch_size`` due messages to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_TIMEOUT,
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids))
+
+
+def _record_failure(outbound, error):
+    outbound.last_error = str(error)
+    if outbound.attempts >= MAX_ATTEMPTS:
+        outbound.status = 'FAILED'
+        logger.error("Giving up on email %s to %s: %s", outbound.pk, outbound.recipient, error)
+    else:
+        outbound.next_attempt_at = timezone.now() + RETRY_BASE_DELAY * 2 ** (outbound.attempts - 1)
+    outbound.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+
+
+def _deliver(outbound, connection):
+    EmailMessage(outbound.subject, outbound.body, None, [outbound.recipient], connection=connection).send()
+    outbound.status = 'SENT'
+    outbound.sent_at = timezone.now()
+    outbound.last_error = ''
+    outbound.save(update_fields=['status', 'sent_at', 'last_error'])
+
+
+def send_queued_email(batch_size=OUTBOX_BATCH_SIZE):
+    """Send one batch of due messages over a single connection. Returns ``(sent, failed)``."""
+    batch = claim_due_email(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for outbound in batch:
+            _record_failure(outbound, e)
+        return 0, len(batch)
+
+    sent = failed = 0
+    reconnected = False
+    index = 0
+    try:
+        while index < len(batch):
+            outbound = batch[index]
+            try:
+                _deliver(outbound, connection)
+            except DISCONNECT_ERRORS as e:
+                error = e
+                if not reconnected:
+                    # The server dropped us mid-batch: reopen once and retry this message.
+                    reconnected = True
+                    logger.warning("SMTP connection dropped, reconnecting: %s", e)
+                    try:
+                        connection.close()
+                        connection.open()
+                    except Exception as reopen_error:
+                        error = reopen_error
+                    else:
+                        continue
+                # Still no connection, so the rest of the batch would fail the same way.
+                for outbound in batch[index:]:
+                    _record_failure(outbound, error)
+                failed += len(batch) - index
+                break
+            except Exception as e:
+                _record_failure(outbound, e)
+                failed += 1
+            else:
+                sent += 1
+            index += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def digest_confirmation_token(post):
+    # Signs the address too, so a link stops working once the post's email changes.
+    return signing.dumps([post.pk, post.email], salt=DIGEST_CONFIRMATION_SALT)
+
+
+def queue_digest_confirmation(post, domain):
+    body = render_to_string('tracker/digest_confirmation_email.html', {
+        'post': post, 'domain': domain, 'token': digest_confirmation_token(post),
+    })
+    return queue_email("Confirm comment notifications", body, post.email)
+
+
+def confirm_digest_email(token):
+    """Mark the address a confirmation link was sent to as confirmed. Returns False for a bad, expired or stale link."""
+    try:
+        pk, email = signing.loads(token, salt=DIGEST_CONFIRMATION_SALT, max_age=DIGEST_CONFIRMATION_MAX_AGE)
+    except (signing.BadSignature, TypeError, ValueError):
+        return False
+    return AdmissionPost.objects.filter(pk=pk, email=email, notify_comments=True).update(email_confirmed=True) > 0
+
+
+def queue_comment_digests():
+    """Queue one email per subscribed, confirmed post that has comments since its last digest."""
+    new_comments = Comment.objects.filter(post=OuterRef('pk'), id__gt=OuterRef('comment_digest_watermark'))
+    posts = AdmissionPost.objects.filter(notify_comments=True, email_confirmed=True, email__gt='').filter(
+        Exists(new_comments)
+    )
+
+    queued = 0
+    for post in posts.iterator():
+        comments = post.comments.filter(id__gt=post.comment_digest_watermark)
+        watermark = comments.aggregate(Max('id'))['id__max']
+        if watermark is None:
+            continue
+        # Bounded by the watermark, so a comment committed meanwhile waits for the next digest.
+        comments = comments.filter(id__lte=watermark).select_related('user').order_by('id')
+        if post.user_id:
+            comments = comments.exclude(user_id=post.user_id)
+        comments = list(comments)
+        with transaction.atomic():
+            if comments:
+                body = render_to_string('tracker/comment_digest_email.html', {'post': post, 'comments': comments})
+                queue_email(f"New comments on your post about {post.university}", body, post.email)
+                queued += 1
+            # update() keeps updated_at and the save signals out of this bookkeeping.
+            AdmissionPost.objects.filter(pk=post.pk).update(comment_digest_watermark=watermark)
+    return queued
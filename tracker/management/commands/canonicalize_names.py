@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from tracker.names import canonicalize_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Map posts onto University and Major rows through the alias tables, in committed batches. '
+        'Safe to interrupt and rerun.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--start-after', type=int, default=0, help='Skip posts up to and including this id.')
+        parser.add_argument(
+            '--all', action='store_true', help='Revisit every post, not just unmapped ones, e.g. after editing aliases.'
+        )
+
+    def handle(self, *args, **options):
+        def progress(last_pk, updated):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Up to post {last_pk}: {updated} updated.')
+
+        updated = canonicalize_posts(
+            batch_size=options['batch_size'],
+            start_after=options['start_after'],
+            everything=options['all'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Canonicalized names on {updated} posts.'))
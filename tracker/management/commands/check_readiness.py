@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.health import NONCRITICAL_CHECKS, READINESS_CHECKS, checks_ok, readiness, run_checks
+
+
+class Command(BaseCommand):
+    help = 'Check that the database and file storage are reachable.'
+
+    def add_arguments(self, parser):
+        # Validated in handle(): argparse rejects an empty list against choices.
+        parser.add_argument('checks', nargs='*', help=f"Only run these checks ({', '.join(sorted(READINESS_CHECKS))}).")
+        parser.add_argument('--cached', action='store_true', help='Reuse a recent result instead of checking again.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['checks']) - set(READINESS_CHECKS)
+        if unknown:
+            raise CommandError(f"Unknown checks: {', '.join(sorted(unknown))}")
+        if options['checks']:
+            checks = run_checks(options['checks'])
+            ok = all(check['ok'] for check in checks.values())
+        else:
+            checks = readiness(refresh=not options['cached'])['checks']
+            ok = checks_ok(checks)
+        for name, check in checks.items():
+            if check['ok']:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok ({check['ms']} ms)"))
+            else:
+                style = self.style.WARNING if name in NONCRITICAL_CHECKS else self.style.ERROR
+                self.stdout.write(style(f"{name}: {check['error']} ({check['ms']} ms)"))
+        if not ok:
+            raise CommandError('Readiness checks failed.')
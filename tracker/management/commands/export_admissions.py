@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exports import EXPORT_FORMATS, EXPORT_KINDS, ExportError, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Stream admission posts or the aggregated stats to a CSV or Parquet file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORT_KINDS)
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write; CSV goes to stdout when omitted.')
+        for name in ('university', 'major', 'degree_type', 'year', 'term', 'count_type'):
+            parser.add_argument(f'--{name}')
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        if fmt == 'parquet' and not options['output']:
+            raise CommandError("Parquet exports need --output.")
+        try:
+            chunks = export_chunks(options['kind'], fmt, options)
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        mode, encoding = ('wb', None) if fmt == 'parquet' else ('w', 'utf-8')
+        with open(options['output'], mode, encoding=encoding, newline='' if encoding else None) as f:
+            for chunk in chunks:
+                f.write(chunk)
@@ -0,0 +1,48 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importers import IMPORT_FORMATS, import_posts
+
+
+class Command(BaseCommand):
+    help = 'Import historical admission results from a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--errors', help='Write rejected rows as CSV (line, field, message) to this file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt == 'json':
+            fmt = 'jsonl'
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['line', 'field', 'message'])
+
+        def report(line_number, errors):
+            for field, messages in errors.items():
+                for message in messages:
+                    if error_writer:
+                        error_writer.writerow([line_number, field, message])
+                    else:
+                        self.stderr.write(f"Line {line_number}: {field}: {message}")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                result = import_posts(stream, fmt, chunk_size=options['chunk_size'], on_error=report)
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} of {result.processed} rows ({result.failed} rejected)."
+        ))
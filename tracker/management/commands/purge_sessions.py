@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.sessions import SESSION_PURGE_BATCH_SIZE, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SESSION_PURGE_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running and purge every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = purge_expired_sessions(options['batch_size'])
+            self.stdout.write(f"Deleted {deleted} expired sessions.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tracker.stats import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the admission statistics rollup table from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollup(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} statistics rollup rows.'))
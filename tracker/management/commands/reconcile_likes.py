@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tracker.likes import recount_likes
+
+
+class Command(BaseCommand):
+    help = 'Repair denormalized post like counts that have drifted from the likes table.'
+
+    def handle(self, *args, **options):
+        repaired = recount_likes()
+        self.stdout.write(self.style.SUCCESS(f'Repaired like counts on {repaired} posts.'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.mail import OUTBOX_BATCH_SIZE, queue_comment_digests, send_queued_email
+
+
+class Command(BaseCommand):
+    help = 'Send due messages from the email outbox and queue comment notification digests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of draining the outbox once.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--digest-interval', type=float, default=900.0, help='Seconds between comment digests.')
+
+    def handle(self, *args, **options):
+        next_digest = 0
+        while True:
+            if time.monotonic() >= next_digest:
+                queued = queue_comment_digests()
+                if queued:
+                    self.stdout.write(f"Queued {queued} comment digests.")
+                next_digest = time.monotonic() + options['digest_interval']
+
+            while True:
+                sent, failed = send_queued_email(options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+                if sent + failed < options['batch_size']:
+                    break
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from tracker.replicas import replicas
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into each local SQLite replica, standing in for replication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replicas to refresh (default: every DATABASE_REPLICAS alias).')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replicas()
+        if not aliases:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS (DJANGO_READ_REPLICA=True locally).')
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError('sync_replica only copies SQLite databases; real replicas replicate themselves.')
+            primary.ensure_connection()
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f"Copied {DEFAULT_DB_ALIAS} to {alias}.")
@@ -0,0 +1,269 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_SECONDS = 1.0
+# A statement repeated this many times in one request is logged as a likely N+1.
+N_PLUS_ONE_THRESHOLD = 10
+# Seconds between writes of this process's metrics file.
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'tracker_http_requests_total': ('counter', 'Requests by view, method and status.', None),
+    'tracker_http_request_duration_seconds': ('histogram', 'Time to produce a response, by view.', LATENCY_BUCKETS),
+    'tracker_db_queries_per_request': ('histogram', 'Database queries per request, by view.', QUERY_COUNT_BUCKETS),
+    'tracker_db_query_seconds_total': ('counter', 'Time spent in database queries, by view.', None),
+    'tracker_template_render_seconds_total': ('counter', 'Time spent rendering templates, by view.', None),
+    'tracker_repeated_queries_total': ('counter', 'Requests that repeated one statement (likely N+1), by view.', None),
+    'tracker_cache_requests_total': ('counter', 'Application cache lookups by cache and result.', None),
+    'tracker_replica_fallbacks_total': ('counter', 'Read-only views rerun on the primary after a replica failed, by database.', None),
+    'tracker_throttled_requests_total': ('counter', 'Writes refused with 429 by the rate limiter, by scope.', None),
+}
+
+
+class Registry:
+    """Counters and histograms for this process.
+
+    Each gunicorn worker keeps its own registry and, when ``METRICS_DIR`` is
+    set, writes it to ``<METRICS_DIR>/<pid>.json`` at most once per
+    ``FLUSH_INTERVAL``. ``/metrics`` merges every file in the directory, so a
+    scrape sees the whole host whichever worker answers it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(buckets) + 1) + [0.0]
+            # Per-bucket counts (the last one is +Inf), then the sum; cumulated when rendered.
+            series[bisect.bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return [[name, labels, value] for (name, labels), value in self.values.items()]
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        now = time.monotonic()
+        if not directory or (not force and now - self.flushed_at < FLUSH_INTERVAL):
+            return
+        self.flushed_at = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+
+
+def collect():
+    """Merge the metrics of every worker that has written to ``METRICS_DIR``, or just this process."""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        snapshots = [registry.snapshot()]
+    else:
+        registry.flush(force=True)
+        snapshots = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                total = merged.setdefault(key, [0] * len(value))
+                merged[key] = [a + b for a, b in zip(total, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def render_prometheus(merged):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        if not series:
+            continue
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = Counter()
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+_current = contextvars.ContextVar('tracker_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query_time += time.perf_counter() - start
+        stats.queries[sql] += 1
+
+
+def instrument_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_templates():
+    """Time top-level template renders (TemplateResponse, render, render_to_string)."""
+    from django.template.backends.django import Template
+
+    render = Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    @wraps(render)
+    def timed_render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None or stats.rendering:
+            return render(self, context, request)
+        stats.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+            stats.rendering = False
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+def record_cache(cache_name, hit):
+    registry.inc('tracker_cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+def record_request(request, response, stats, duration):
+    view = view_name(request)
+    labels = {'view': view}
+    query_count = sum(stats.queries.values())
+    registry.inc('tracker_http_requests_total', {**labels, 'method': request.method, 'status': response.status_code})
+    registry.observe('tracker_http_request_duration_seconds', labels, duration)
+    registry.observe('tracker_db_queries_per_request', labels, query_count)
+    registry.inc('tracker_db_query_seconds_total', labels, stats.query_time)
+    registry.inc('tracker_template_render_seconds_total', labels, stats.template_time)
+
+    if duration >= getattr(settings, 'SLOW_REQUEST_SECONDS', SLOW_REQUEST_SECONDS):
+        logger.warning(
+            "Slow request: %s %s (%s) took %.3fs with %d queries (%.3fs in the database, %.3fs in templates)",
+            request.method, request.path, view, duration, query_count, stats.query_time, stats.template_time,
+        )
+    threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+    repeated = [(sql, count) for sql, count in stats.queries.most_common(3) if count >= threshold]
+    if repeated:
+        registry.inc('tracker_repeated_queries_total', labels)
+        for sql, count in repeated:
+            logger.warning("Possible N+1 in %s: %d executions of %s", view, count, sql[:300])
+    registry.flush()
+
+
+class MetricsMiddleware:
+    """Time each request and count its queries; see ``record_request``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record_request(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # Queries run in sync_to_async threads, which inherit the context
+        # variable; their connections are instrumented as they are created.
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        record_request(request, response, stats, time.perf_counter() - start)
+        return response
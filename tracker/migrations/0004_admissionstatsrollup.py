@@ -0,0 +1,55 @@
+# Generated by Django 5.1 on 2026-10-18 14:34
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+STATUS_GROUPS = {
+    'admissions': ['ACCEPTED', 'ACCEPTED FROM WAITLIST', 'ENROLLED'],
+    'rejections': ['REJECTED', 'REJECTED FROM WAITLIST'],
+    'in_progress': ['APPLIED', 'APPLYING', 'WAITLISTED', 'INTERVIEW'],
+    'questions': ['QUESTION'],
+}
+
+
+def populate_rollup(apps, schema_editor):
+    AdmissionPost = apps.get_model('tracker', 'AdmissionPost')
+    AdmissionStatsRollup = apps.get_model('tracker', 'AdmissionStatsRollup')
+    rows = AdmissionPost.objects.order_by().values('university', 'major', 'degree_type', 'year', 'term').annotate(
+        total_count=Count('id'),
+        **{
+            f'{group}_count': Count('id', filter=Q(status__in=statuses))
+            for group, statuses in STATUS_GROUPS.items()
+        }
+    )
+    AdmissionStatsRollup.objects.bulk_create((AdmissionStatsRollup(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_user_email_verified_user_verification_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('university', models.CharField(max_length=100)),
+                ('major', models.CharField(max_length=100)),
+                ('degree_type', models.CharField(choices=[('BS', 'Bachelor of Science'), ('BA', 'Bachelor of Arts'), ('MS', 'Master of Science'), ('MA', 'Master of Arts'), ('PHD', 'Doctor of Philosophy'), ('OTHER', 'Other')], max_length=5)),
+                ('year', models.IntegerField()),
+                ('term', models.CharField(choices=[('FALL', 'Fall'), ('SPRING', 'Spring'), ('SUMMER', 'Summer'), ('WINTER', 'Winter')], max_length=10)),
+                ('admissions_count', models.IntegerField(default=0)),
+                ('rejections_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('questions_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['university', 'major', 'degree_type', 'year', 'term'],
+                'constraints': [models.UniqueConstraint(fields=('university', 'major', 'degree_type', 'year', 'term'), name='unique_stats_rollup_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(university, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(major, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(post_grad_plans, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(notes, '')), 'C')"
+)
+
+POSTGRES_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS tracker_post_search_idx ON tracker_admissionpost USING gin (({POSTGRES_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS tracker_post_university_trgm ON tracker_admissionpost USING gin (university gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS tracker_post_major_trgm ON tracker_admissionpost USING gin (major gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS tracker_rollup_university_trgm ON tracker_admissionstatsrollup USING gin (university gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS tracker_rollup_major_trgm ON tracker_admissionstatsrollup USING gin (major gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS tracker_post_search_idx",
+    "DROP INDEX IF EXISTS tracker_post_university_trgm",
+    "DROP INDEX IF EXISTS tracker_post_major_trgm",
+    "DROP INDEX IF EXISTS tracker_rollup_university_trgm",
+    "DROP INDEX IF EXISTS tracker_rollup_major_trgm",
+]
+
+# A snapshot of tracker.search.SQLITE_SEARCH_SCHEMA as of this migration, plus a
+# reindex; the app reinstalls its current schema after every migrate.
+SQLITE_FTS_COLUMNS = 'university, major, notes, post_grad_plans'
+SQLITE_NEW_VALUES = 'new.university, new.major, new.notes, new.post_grad_plans'
+SQLITE_OLD_VALUES = 'old.university, old.major, old.notes, old.post_grad_plans'
+SQLITE_FORWARDS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS tracker_admissionpost_fts USING fts5({SQLITE_FTS_COLUMNS}, "
+    f"content='tracker_admissionpost', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tracker_admissionpost_fts_vocab USING fts5vocab(tracker_admissionpost_fts, 'row')",
+    f"CREATE TRIGGER IF NOT EXISTS tracker_admissionpost_fts_ai AFTER INSERT ON tracker_admissionpost BEGIN "
+    f"INSERT INTO tracker_admissionpost_fts(rowid, {SQLITE_FTS_COLUMNS}) VALUES (new.id, {SQLITE_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS tracker_admissionpost_fts_ad AFTER DELETE ON tracker_admissionpost BEGIN "
+    f"INSERT INTO tracker_admissionpost_fts(tracker_admissionpost_fts, rowid, {SQLITE_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS tracker_admissionpost_fts_au AFTER UPDATE ON tracker_admissionpost BEGIN "
+    f"INSERT INTO tracker_admissionpost_fts(tracker_admissionpost_fts, rowid, {SQLITE_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD_VALUES}); "
+    f"INSERT INTO tracker_admissionpost_fts(rowid, {SQLITE_FTS_COLUMNS}) VALUES (new.id, {SQLITE_NEW_VALUES}); END",
+    "INSERT INTO tracker_admissionpost_fts(tracker_admissionpost_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS tracker_admissionpost_fts_ai",
+    "DROP TRIGGER IF EXISTS tracker_admissionpost_fts_ad",
+    "DROP TRIGGER IF EXISTS tracker_admissionpost_fts_au",
+    "DROP TABLE IF EXISTS tracker_admissionpost_fts_vocab",
+    "DROP TABLE IF EXISTS tracker_admissionpost_fts",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_admissionstatsrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['-updated_at', '-id'], name='post_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['test_score', 'id'], name='post_test_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['university', 'major', 'degree_type', 'year', 'term'], name='post_rollup_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['degree_type', 'year', 'term', 'status'], name='post_degree_year_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['year', 'term', 'status'], name='post_year_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionstatsrollup',
+            index=models.Index(fields=['degree_type', 'year', 'term'], name='rollup_degree_year_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionstatsrollup',
+            index=models.Index(fields=['year', 'term'], name='rollup_year_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionstatsrollup',
+            index=models.Index(fields=['major'], name='rollup_major_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['post', 'created_at', 'id'], name='comment_top_level_idx'),
+        ),
+    ]
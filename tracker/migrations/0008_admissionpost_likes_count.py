@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_likes_count(apps, schema_editor):
+    AdmissionPost = apps.get_model('tracker', 'AdmissionPost')
+    Like = AdmissionPost.likes.through
+    counts = (
+        Like.objects.filter(admissionpost_id=OuterRef('pk'))
+        .order_by().values('admissionpost_id').annotate(n=Count('pk')).values('n')
+    )
+    AdmissionPost.objects.update(likes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='admissionpost',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_comment_roots(apps, schema_editor):
+    Comment = apps.get_model('tracker', 'Comment')
+    parents = dict(Comment.objects.filter(parent__isnull=False).values_list('id', 'parent_id'))
+    replies = []
+    for comment_id in parents:
+        root_id = parents[comment_id]
+        while root_id in parents:
+            root_id = parents[root_id]
+        replies.append(Comment(id=comment_id, root_id=root_id))
+    Comment.objects.bulk_update(replies, ['root'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_admissionpost_likes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread', to='tracker.comment'),
+        ),
+        migrations.RunPython(populate_comment_roots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,203 @@
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, Min, Q, Value, When
+
+STATUS_GROUPS = {
+    'admissions': ['ACCEPTED', 'ACCEPTED FROM WAITLIST', 'ENROLLED'],
+    'rejections': ['REJECTED', 'REJECTED FROM WAITLIST'],
+    'in_progress': ['APPLIED', 'APPLYING', 'WAITLISTED', 'INTERVIEW'],
+    'questions': ['QUESTION'],
+}
+
+
+# Post field -> (entity model, alias model); the alias's foreign key has the post field's name.
+NAME_MODELS = {
+    'university': ('University', 'UniversityAlias'),
+    'major': ('Major', 'MajorAlias'),
+}
+
+
+# Distinct spellings mapped per UPDATE.
+UPDATE_CHUNK_SIZE = 500
+
+
+def normalize_name(name):
+    # A snapshot of tracker.names.normalize_name as of this migration.
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    name = re.sub(r"[.']", '', name.casefold().replace('&', ' and '))
+    words = re.sub(r'[\W_]+', ' ', name).split()
+    if words[:1] == ['the'] and len(words) > 1:
+        words = words[1:]
+    return ' '.join(words)[:100]
+
+
+def canonicalize_posts(apps, schema_editor):
+    # Mirrors tracker.names.Canonicalizer: each normalized spelling gets an
+    # alias, and an entity named after its earliest post's spelling.
+    db_alias = schema_editor.connection.alias
+    AdmissionPost = apps.get_model('tracker', 'AdmissionPost')
+    posts = AdmissionPost.objects.using(db_alias)
+    for field, (entity_name, alias_name) in NAME_MODELS.items():
+        entities = apps.get_model('tracker', entity_name).objects.using(db_alias)
+        aliases = apps.get_model('tracker', alias_name).objects.using(db_alias)
+        spellings = posts.order_by().values(field).annotate(first=Min('pk')).order_by('first').values_list(field, flat=True)
+        resolved, ids = {}, {}
+        for name in spellings:
+            key = normalize_name(name)
+            if not key:
+                continue
+            if key not in resolved:
+                alias = aliases.filter(alias=key).first()
+                if alias is None:
+                    entity, _ = entities.get_or_create(name=' '.join(name.split())[:100])
+                    alias = aliases.create(alias=key, **{field: entity})
+                resolved[key] = getattr(alias, f'{field}_id')
+            ids[name] = resolved[key]
+        names = list(ids)
+        for start in range(0, len(names), UPDATE_CHUNK_SIZE):
+            chunk = names[start:start + UPDATE_CHUNK_SIZE]
+            posts.filter(**{f'{field}__in': chunk}).update(**{f'canonical_{field}': Case(
+                *[When(**{field: name}, then=Value(ids[name])) for name in chunk],
+            )})
+
+
+def regroup_rollup(apps, schema_editor):
+    # The old rows were keyed on the dropped name columns.
+    db_alias = schema_editor.connection.alias
+    AdmissionPost = apps.get_model('tracker', 'AdmissionPost')
+    AdmissionStatsRollup = apps.get_model('tracker', 'AdmissionStatsRollup')
+    AdmissionStatsRollup.objects.using(db_alias).all().delete()
+    rows = AdmissionPost.objects.using(db_alias).order_by().values(
+        'canonical_university_id', 'canonical_major_id', 'degree_type', 'year', 'term'
+    ).annotate(
+        total_count=Count('id'),
+        **{
+            f'{group}_count': Count('id', filter=Q(status__in=statuses))
+            for group, statuses in STATUS_GROUPS.items()
+        }
+    )
+    AdmissionStatsRollup.objects.using(db_alias).bulk_create(
+        (AdmissionStatsRollup(**row) for row in rows), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_comment_root'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Major',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MajorAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'major aliases',
+            },
+        ),
+        migrations.CreateModel(
+            name='University',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'universities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UniversityAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'university aliases',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='admissionstatsrollup',
+            options={'ordering': ['canonical_university__name', 'canonical_major__name', 'degree_type', 'year', 'term']},
+        ),
+        migrations.RemoveConstraint(
+            model_name='admissionstatsrollup',
+            name='unique_stats_rollup_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='admissionpost',
+            name='post_rollup_key_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='admissionstatsrollup',
+            name='rollup_major_idx',
+        ),
+        migrations.RemoveField(
+            model_name='admissionstatsrollup',
+            name='major',
+        ),
+        migrations.RemoveField(
+            model_name='admissionstatsrollup',
+            name='university',
+        ),
+        migrations.AddField(
+            model_name='admissionpost',
+            name='canonical_major',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='posts', to='tracker.major'),
+        ),
+        migrations.AddField(
+            model_name='admissionstatsrollup',
+            name='canonical_major',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stats_rollups', to='tracker.major'),
+        ),
+        migrations.AddField(
+            model_name='majoralias',
+            name='major',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='tracker.major'),
+        ),
+        migrations.AddField(
+            model_name='admissionpost',
+            name='canonical_university',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='posts', to='tracker.university'),
+        ),
+        migrations.AddField(
+            model_name='admissionstatsrollup',
+            name='canonical_university',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stats_rollups', to='tracker.university'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionpost',
+            index=models.Index(fields=['canonical_university', 'canonical_major', 'degree_type', 'year', 'term'], name='post_rollup_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admissionstatsrollup',
+            index=models.Index(fields=['canonical_major'], name='rollup_major_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='admissionstatsrollup',
+            constraint=models.UniqueConstraint(fields=('canonical_university', 'canonical_major', 'degree_type', 'year', 'term'), name='unique_stats_rollup_key'),
+        ),
+        migrations.AddField(
+            model_name='universityalias',
+            name='university',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='tracker.university'),
+        ),
+        migrations.RunPython(canonicalize_posts, migrations.RunPython.noop),
+        migrations.RunPython(regroup_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1 on 2026-10-18 15:42
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+COUNTER_FIELDS = ['admissions_count', 'rejections_count', 'in_progress_count', 'questions_count', 'total_count']
+ROLLUP_KEY = ['canonical_university', 'canonical_major', 'degree_type', 'year', 'term']
+
+POSTGRES_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS tracker_university_name_trgm ON tracker_university USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS tracker_major_name_trgm ON tracker_major USING gin (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS tracker_university_name_trgm",
+    "DROP INDEX IF EXISTS tracker_major_name_trgm",
+]
+
+
+def merge_duplicate_keys(apps, schema_editor):
+    # The old constraint let rows with a null key repeat; fold them together.
+    AdmissionStatsRollup = apps.get_model('tracker', 'AdmissionStatsRollup')
+    rows = AdmissionStatsRollup.objects.using(schema_editor.connection.alias)
+    duplicates = rows.order_by().values(*ROLLUP_KEY).annotate(
+        rows=Count('id'), keep=Min('id'), **{f'sum_{field}': Sum(field) for field in COUNTER_FIELDS}
+    ).filter(rows__gt=1)
+    for duplicate in duplicates:
+        key = {field: duplicate[field] for field in ROLLUP_KEY}
+        rows.filter(pk=duplicate['keep']).update(**{field: duplicate[f'sum_{field}'] for field in COUNTER_FIELDS})
+        rows.filter(**key).exclude(pk=duplicate['keep']).delete()
+
+
+def create_name_trigram_indexes(apps, schema_editor):
+    # Serve the stats filters' icontains lookups on the canonical names.
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_FORWARDS:
+            schema_editor.execute(statement)
+
+
+def drop_name_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_BACKWARDS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_canonical_names'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='admissionstatsrollup',
+            name='unique_stats_rollup_key',
+        ),
+        migrations.AddIndex(
+            model_name='admissionstatsrollup',
+            index=models.Index(fields=['canonical_university', 'canonical_major', 'degree_type', 'year', 'term'], name='rollup_key_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='admissionstatsrollup',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('canonical_university', models.Value(0)), django.db.models.functions.comparison.Coalesce('canonical_major', models.Value(0)), models.F('degree_type'), models.F('year'), models.F('term'), name='unique_stats_rollup_key'),
+        ),
+        migrations.RunPython(create_name_trigram_indexes, drop_name_trigram_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-18 16:06
+
+from django.db import migrations
+
+POSTGRES_FORWARDS = [
+    "CREATE INDEX IF NOT EXISTS post_test_score_desc_idx ON tracker_admissionpost (test_score DESC NULLS LAST, id DESC)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS post_test_score_desc_idx",
+]
+
+
+def create_test_score_desc_index(apps, schema_editor):
+    # The "-test_score" timeline sort; post_test_score_idx read backwards would put NULLs first.
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_FORWARDS:
+            schema_editor.execute(statement)
+
+
+def drop_test_score_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_BACKWARDS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_rollup_key_nulls_name_trigrams'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_test_score_desc_index, drop_test_score_desc_index),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
@@ -35,6 +37,46 @@ class User(AbstractUser):
     def get_display_name(self):
         return self.anonymous_username or "Anonymous User"
 
+class University(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'universities'
+
+class UniversityAlias(models.Model):
+    # A spelling as normalized by tracker.names.normalize_name.
+    alias = models.CharField(max_length=100, unique=True)
+    university = models.ForeignKey(University, on_delete=models.CASCADE, related_name='aliases')
+
+    def __str__(self):
+        return self.alias
+
+    class Meta:
+        verbose_name_plural = 'university aliases'
+
+class Major(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+class MajorAlias(models.Model):
+    alias = models.CharField(max_length=100, unique=True)
+    major = models.ForeignKey(Major, on_delete=models.CASCADE, related_name='aliases')
+
+    def __str__(self):
+        return self.alias
+
+    class Meta:
+        verbose_name_plural = 'major aliases'
+
 class AdmissionPost(models.Model):
     DEGREE_CHOICES = [
         ('BS', 'Bachelor of Science'),
@@ -80,6 +122,14 @@ class AdmissionPost(models.Model):
         ('SUMMER', 'Summer'),
         ('WINTER', 'Winter'),
     ]
+
+    STATUS_GROUPS = {
+        'admissions': ['ACCEPTED', 'ACCEPTED FROM WAITLIST', 'ENROLLED'],
+        'rejections': ['REJECTED', 'REJECTED FROM WAITLIST'],
+        'in_progress': ['APPLIED', 'APPLYING', 'WAITLISTED', 'INTERVIEW'],
+        'questions': ['QUESTION'],
+    }
+
     year = models.IntegerField(default=2025)  # Default to 2025 for existing records
     term = models.CharField(max_length=10, choices=TERM_CHOICES, default='SPRING')  # Default to Spring for existing records
     
@@ -88,6 +138,14 @@ class AdmissionPost(models.Model):
     degree_type = models.CharField(max_length=5, choices=DEGREE_CHOICES)
     major = models.CharField(max_length=100)
     university = models.CharField(max_length=100)
+    # Set from the free-text names by tracker.names; the stats group and filter on these.
+    canonical_university = models.ForeignKey(
+        University, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='posts',
+        db_index=False,  # Leads post_rollup_key_idx.
+    )
+    canonical_major = models.ForeignKey(
+        Major, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='posts'
+    )
     country = models.CharField(max_length=50)
     application_round = models.CharField(max_length=20)
     status = models.CharField(max_length=24, choices=STATUS_CHOICES)
@@ -107,13 +165,35 @@ class AdmissionPost(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     email = models.EmailField(blank=True, null=True)
     notify_comments = models.BooleanField(default=False)
+    # Digests only go to an address its owner has confirmed, see tracker.mail.
+    email_confirmed = models.BooleanField(default=False, editable=False)
+    # Id of the newest comment a digest has covered. Ids rather than timestamps,
+    # so a comment whose transaction commits late is still picked up.
+    comment_digest_watermark = models.BigIntegerField(default=0, editable=False)
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
+    # Denormalized from ``likes``; kept in step by tracker.likes and repaired by reconcile_likes.
+    likes_count = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.get_degree_type_display()} in {self.major} at {self.university}"
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Timeline sort orders, with id as the keyset tie breaker.
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+            models.Index(fields=['-updated_at', '-id'], name='post_updated_idx'),
+            # Read backwards, this serves "-test_score" on SQLite. PostgreSQL
+            # would put NULLs first that way, so migration 0012 adds a
+            # descending NULLS LAST index there, which SQLite cannot declare.
+            models.Index(fields=['test_score', 'id'], name='post_test_score_idx'),
+            # Stats filters and the rollup GROUP BY key.
+            models.Index(
+                fields=['canonical_university', 'canonical_major', 'degree_type', 'year', 'term'], name='post_rollup_key_idx'
+            ),
+            models.Index(fields=['degree_type', 'year', 'term', 'status'], name='post_degree_year_term_idx'),
+            models.Index(fields=['year', 'term', 'status'], name='post_year_term_idx'),
+        ]
 
 class Comment(models.Model):
     post = models.ForeignKey(AdmissionPost, on_delete=models.CASCADE, related_name='comments')
@@ -121,9 +201,93 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # The top-level comment of the thread, so a whole thread loads with one indexed query.
+    root = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='thread')
 
     def __str__(self):
         return f"Comment by {self.user.get_display_name()} on {self.post}"
 
+    def save(self, *args, **kwargs):
+        if self.parent_id and not self.root_id:
+            self.root_id = self.parent.root_id or self.parent_id
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(
+                fields=['post', 'created_at', 'id'],
+                condition=models.Q(parent__isnull=True),
+                name='comment_top_level_idx',
+            ),
+        ]
+
+class AdmissionStatsRollup(models.Model):
+    # Null only for posts without a usable name. Indexed by rollup_key_idx and
+    # rollup_major_idx; unique_stats_rollup_key counts nulls as equal.
+    canonical_university = models.ForeignKey(
+        University, on_delete=models.PROTECT, null=True, related_name='stats_rollups', db_index=False
+    )
+    canonical_major = models.ForeignKey(
+        Major, on_delete=models.PROTECT, null=True, related_name='stats_rollups', db_index=False
+    )
+    degree_type = models.CharField(max_length=5, choices=AdmissionPost.DEGREE_CHOICES)
+    year = models.IntegerField()
+    term = models.CharField(max_length=10, choices=AdmissionPost.TERM_CHOICES)
+    admissions_count = models.IntegerField(default=0)
+    rejections_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    questions_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return (
+            f"{self.degree_type} in {self.canonical_major} at {self.canonical_university} ({self.term} {self.year})"
+        )
+
+    class Meta:
+        ordering = ['canonical_university__name', 'canonical_major__name', 'degree_type', 'year', 'term']
+        indexes = [
+            models.Index(fields=['degree_type', 'year', 'term'], name='rollup_degree_year_term_idx'),
+            models.Index(fields=['year', 'term'], name='rollup_year_term_idx'),
+            models.Index(fields=['canonical_major'], name='rollup_major_idx'),
+            models.Index(
+                fields=['canonical_university', 'canonical_major', 'degree_type', 'year', 'term'],
+                name='rollup_key_idx',
+            ),
+        ]
+        constraints = [
+            # A unique index treats nulls as distinct, so they are compared as 0 (never a real id).
+            models.UniqueConstraint(
+                Coalesce('canonical_university', Value(0)), Coalesce('canonical_major', Value(0)),
+                'degree_type', 'year', 'term',
+                name='unique_stats_rollup_key',
+            ),
+        ]
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient} ({self.get_status_display()})"
+
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='PENDING'), name='outbox_due_idx'),
+        ]
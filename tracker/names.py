@@ -0,0 +1,133 @@
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Q
+
+from .caching import bump_version_on_commit
+from .models import AdmissionPost, Major, MajorAlias, University, UniversityAlias
+from .stats import add_post_delta, apply_rollup_deltas, new_rollup_deltas, post_values, rebuild_rollup
+
+# Free-text post field -> (canonical foreign key, entity model, alias model).
+# The alias model's foreign key to the entity has the same name as the post field.
+NAME_FIELDS = {
+    'university': ('canonical_university', University, UniversityAlias),
+    'major': ('canonical_major', Major, MajorAlias),
+}
+
+
+def normalize_name(name):
+    """Reduce a spelling to the alias key it shares with its variants.
+
+    Accents, case, punctuation, repeated whitespace and a leading "the" are
+    dropped, and "&" reads as "and", so "The University of São Paulo" and
+    "university of sao paulo." share a key.
+    """
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    name = re.sub(r"[.']", '', name.casefold().replace('&', ' and '))
+    words = re.sub(r'[\W_]+', ' ', name).split()
+    if words[:1] == ['the'] and len(words) > 1:
+        words = words[1:]
+    return ' '.join(words)[:100]
+
+
+class Canonicalizer:
+    """Resolves free-text names to ``University`` and ``Major`` ids.
+
+    Lookups are memoized, and ``canonicalize`` resolves a whole batch of posts
+    with one alias query per field. A name with no alias yet gets a new entity
+    named after its first spelling.
+    """
+
+    def __init__(self):
+        self.resolved = {field: {} for field in NAME_FIELDS}
+
+    def resolve_many(self, field, names):
+        _, model, alias_model = NAME_FIELDS[field]
+        resolved = self.resolved[field]
+        keys = {normalize_name(name): name for name in names}
+        keys.pop('', None)
+        missing = [key for key in keys if key not in resolved]
+        if missing:
+            resolved.update(alias_model.objects.filter(alias__in=missing).values_list('alias', f'{field}_id'))
+        for key in missing:
+            if key not in resolved:
+                resolved[key] = self._create(field, model, alias_model, key, keys[key])
+        return {name: resolved.get(normalize_name(name)) for name in names}
+
+    def resolve(self, field, name):
+        return self.resolve_many(field, [name])[name]
+
+    def _create(self, field, model, alias_model, key, name):
+        with transaction.atomic():
+            entity, _ = model.objects.get_or_create(name=' '.join(name.split())[:100])
+            # get_or_create settles a race with another writer adding the same alias.
+            alias, _ = alias_model.objects.get_or_create(alias=key, defaults={field: entity})
+        return getattr(alias, f'{field}_id')
+
+    def canonicalize(self, posts):
+        """Point each post's canonical keys at its names. Returns the posts whose keys changed."""
+        changed = [False] * len(posts)
+        for field, (foreign_key, _, _) in NAME_FIELDS.items():
+            ids = self.resolve_many(field, {getattr(post, field) for post in posts})
+            for index, post in enumerate(posts):
+                entity_id = ids[getattr(post, field)]
+                if getattr(post, f'{foreign_key}_id') != entity_id:
+                    setattr(post, f'{foreign_key}_id', entity_id)
+                    changed[index] = True
+        return [post for post, post_changed in zip(posts, changed) if post_changed]
+
+
+def canonicalize_posts(batch_size=1000, start_after=0, everything=False, progress=None):
+    """Map posts onto their ``University`` and ``Major`` rows, one committed batch at a time.
+
+    Only posts missing a canonical key are visited unless ``everything`` is
+    set, which also picks up alias edits. Each batch moves its posts' rollup
+    counts along with them, so the pass can be interrupted and rerun, or
+    resumed past ``start_after``, without a rollup rebuild. ``progress`` is
+    called with the last post id and the running count of updated posts.
+    Returns the number of posts updated.
+    """
+    queryset = AdmissionPost.objects.order_by('pk').only(
+        'university', 'major', 'canonical_university', 'canonical_major', 'degree_type', 'year', 'term', 'status'
+    )
+    if not everything:
+        queryset = queryset.filter(Q(canonical_university__isnull=True) | Q(canonical_major__isnull=True))
+    canonicalizer = Canonicalizer()
+    updated = 0
+    last_pk = start_after
+    while True:
+        with transaction.atomic():
+            posts = list(queryset.filter(pk__gt=last_pk).select_for_update()[:batch_size])
+            if not posts:
+                break
+            previous = {post.pk: post_values(post) for post in posts}
+            changed = canonicalizer.canonicalize(posts)
+            if changed:
+                deltas = new_rollup_deltas()
+                for post in changed:
+                    add_post_delta(deltas, previous[post.pk], -1)
+                    add_post_delta(deltas, post_values(post), 1)
+                AdmissionPost.objects.bulk_update(changed, ['canonical_university', 'canonical_major'])
+                apply_rollup_deltas(deltas)
+                bump_version_on_commit('posts')
+        updated += len(changed)
+        last_pk = posts[-1].pk
+        if progress:
+            progress(last_pk, updated)
+    return updated
+
+
+def merge_names(target, others):
+    """Fold ``others`` into ``target``, a ``University`` or ``Major``, keeping their aliases."""
+    field = target._meta.model_name
+    foreign_key, model, alias_model = NAME_FIELDS[field]
+    other_ids = [entity.pk for entity in others if entity.pk != target.pk]
+    with transaction.atomic():
+        alias_model.objects.filter(**{f'{field}__in': other_ids}).update(**{field: target})
+        AdmissionPost.objects.filter(**{f'{foreign_key}__in': other_ids}).update(**{foreign_key: target})
+        # Merged groups collide in the rollup, so it is recounted rather than patched.
+        rebuild_rollup()
+        model.objects.filter(pk__in=other_ids).delete()
+        bump_version_on_commit('posts')
+    return len(other_ids)
@@ -0,0 +1,85 @@
+from django.core import signing
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'tracker.pagination.cursor'
+
+
+def encode_cursor(value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return signing.dumps([value, pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, field=None):
+    """Return ``(value, pk)`` from a cursor string, or ``None`` if it is missing or tampered with."""
+    if not cursor:
+        return None
+    try:
+        value, pk = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if field is not None and value is not None and field.get_internal_type() == 'DateTimeField':
+        value = parse_datetime(value)
+    return value, pk
+
+
+def keyset_order(sort, nullable=True):
+    """Order by the sort field with ``id`` as the tie breaker.
+
+    NULLs sort last; non-nullable fields keep the plain ordering so it matches their indexes.
+    """
+    field_name = sort.lstrip('-')
+    nulls_last = True if nullable else None
+    if sort.startswith('-'):
+        return [F(field_name).desc(nulls_last=nulls_last), F('id').desc()]
+    return [F(field_name).asc(nulls_last=nulls_last), F('id').asc()]
+
+
+def keyset_filter(sort, value, pk, nullable=True):
+    """Build the ``Q`` selecting rows that come after ``(value, pk)`` in ``keyset_order(sort)``."""
+    field_name = sort.lstrip('-')
+    descending = sort.startswith('-')
+    id_after = Q(id__lt=pk) if descending else Q(id__gt=pk)
+    if value is None:
+        # Already in the trailing block of NULLs, only the tie breaker moves.
+        return Q(**{f'{field_name}__isnull': True}) & id_after
+    beyond = Q(**{f'{field_name}__lt' if descending else f'{field_name}__gt': value})
+    after = beyond | (Q(**{field_name: value}) & id_after)
+    if nullable:
+        after |= Q(**{f'{field_name}__isnull': True})
+    return after
+
+
+def keyset_queryset(queryset, sort, cursor=None):
+    """Order ``queryset`` for keyset paging and skip everything up to ``cursor``."""
+    field = queryset.model._meta.get_field(sort.lstrip('-'))
+    queryset = queryset.order_by(*keyset_order(sort, nullable=field.null))
+    position = decode_cursor(cursor, field)
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(sort, *position, nullable=field.null))
+    return queryset
+
+
+def keyset_page(queryset, sort, cursor=None, page_size=20):
+    """Slice ``queryset`` into one keyset page.
+
+    Returns ``(items, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    items = list(keyset_queryset(queryset, sort, cursor)[:page_size + 1])
+    return _split_page(items, queryset.model, sort, page_size)
+
+
+async def akeyset_page(queryset, sort, cursor=None, page_size=20):
+    """Async version of ``keyset_page``."""
+    items = [item async for item in keyset_queryset(queryset, sort, cursor)[:page_size + 1]]
+    return _split_page(items, queryset.model, sort, page_size)
+
+
+def _split_page(items, model, sort, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, model._meta.get_field(sort.lstrip('-')).attname), last.pk)
+    return items, next_cursor
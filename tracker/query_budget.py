@@ -0,0 +1,257 @@
+"""Query-count and latency budgets for every route in ``tracker/urls.py``.
+
+``run_budget`` seeds posts, comments and likes at increasing scales, requests
+each route with a cold cache and records its status, query count and median
+time. A route whose query count changes between scales does work per row
+(typically an N+1), which ``scaling_problems`` flags alongside routes that
+slowed past a recorded baseline. Used by ``QueryBudgetTest`` and by
+``benchmarks/query_budget.py``, which runs the larger scales.
+"""
+import statistics
+import time
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .likes import Like, set_like
+from .mail import digest_confirmation_token
+from .models import AdmissionPost, Comment, User
+from .names import canonicalize_posts
+from .stats import rebuild_rollup
+from .urls import urlpatterns
+
+SEED_USERS = 50
+COMMENTS_PER_POST = 2
+LIKES_PER_POST = 2
+# Time regressions smaller than this are noise, whatever the ratio.
+TIME_FLOOR = 0.005
+TIME_TOLERANCE = 0.5
+# Growth in median time between the smallest and largest scale that counts as scaling.
+TIME_GROWTH = 3.0
+
+STATUSES = [status for status, _ in AdmissionPost.STATUS_CHOICES]
+
+
+def _viewer():
+    viewer, _ = User.objects.get_or_create(username='budget-viewer', defaults={'anonymous_username': 'Budget Viewer'})
+    return viewer
+
+
+def seed(scale):
+    """Top the database up to ``scale`` posts, each with comments, a reply and likes."""
+    users = list(User.objects.filter(username__startswith='budget-user'))
+    if not users:
+        users = User.objects.bulk_create(
+            User(username=f'budget-user{i}', anonymous_username=f'Budget {i}') for i in range(SEED_USERS)
+        )
+    existing = AdmissionPost.objects.count()
+    posts = AdmissionPost.objects.bulk_create([
+        AdmissionPost(
+            university=f'University {i % 40}', major=f'Major {i % 12}', degree_type=['BS', 'MS', 'PHD'][i % 3],
+            year=2018 + i % 8, term=['FALL', 'SPRING'][i % 2], status=STATUSES[i % len(STATUSES)],
+            country='Budget Country', application_round='Regular', student_type='DOMESTIC',
+            gpa=2.5 + i % 16 / 10, test_type='GRE', test_score=300 + i % 40, likes_count=LIKES_PER_POST,
+            notes=f'Seeded post {i}', user=users[i % SEED_USERS],
+        )
+        for i in range(existing, scale)
+    ], batch_size=1000)
+    comments = Comment.objects.bulk_create([
+        Comment(post=post, user=users[(post.pk + n) % SEED_USERS], content=f'Comment {n}')
+        for post in posts for n in range(COMMENTS_PER_POST)
+    ], batch_size=1000)
+    Comment.objects.bulk_create([
+        Comment(post_id=comment.post_id, user=users[comment.pk % SEED_USERS], content='Reply', parent=comment, root=comment)
+        for comment in comments[::COMMENTS_PER_POST]
+    ], batch_size=1000)
+    Like.objects.bulk_create([
+        Like(admissionpost_id=post.pk, user_id=users[(post.pk + n) % SEED_USERS].pk)
+        for post in posts for n in range(LIKES_PER_POST)
+    ], batch_size=1000)
+    canonicalize_posts()
+    rebuild_rollup()
+
+
+class BudgetContext:
+    """Objects the route cases point at: the newest post, one of its comments and the viewer."""
+
+    def __init__(self):
+        self.viewer = _viewer()
+        self.post = AdmissionPost.objects.order_by('-created_at', '-id').first()
+        self.comment = self.post.comments.filter(parent__isnull=True).first()
+
+    def own_comment(self):
+        return Comment.objects.create(post=self.post, user=self.viewer, content='Budget comment').pk
+
+    def inactive_user(self):
+        user = User.objects.create(username=f'budget-new{User.objects.count()}', is_active=False, verification_token='t')
+        return [urlsafe_base64_encode(force_bytes(user.pk)), 't']
+
+    def digest_confirmation(self):
+        AdmissionPost.objects.filter(pk=self.post.pk).update(notify_comments=True, email='budget@example.com')
+        self.post.email = 'budget@example.com'
+        return [digest_confirmation_token(self.post)]
+
+    def reset_link(self):
+        return [urlsafe_base64_encode(force_bytes(self.viewer.pk)), default_token_generator.make_token(self.viewer)]
+
+    def unlike(self):
+        set_like(self.post.pk, self.viewer.pk, liked=False)
+        return [self.post.pk]
+
+
+class Case:
+    """One request to ``route``. ``args`` and ``data`` may be callables taking the context;
+    anything they create is set up before queries are counted."""
+
+    def __init__(self, route, method='get', args=None, data=None, login=False, json=False, label=None,
+                 linear=False):
+        self.route = route
+        self.method = method
+        self.args = args
+        self.data = data
+        self.login = login
+        self.json = json
+        # Expected to take time in proportion to the rows it returns or summarizes.
+        self.linear = linear
+        self.name = label or (route if method == 'get' else f'{route} ({method.upper()})')
+
+
+CASES = [
+    Case('admission_timeline'),
+    Case('admission_timeline', login=True, label='admission_timeline (signed in)'),
+    # Same names and stats group as the second seeded post, so every scale takes the same write path.
+    Case('admission_timeline', 'post', login=True, data={
+        'degree_type': 'MS', 'major': 'Major 1', 'university': 'University 1', 'country': 'Budget Country',
+        'year': 2019, 'term': 'SPRING', 'status': 'ACCEPTED', 'student_type': 'DOMESTIC',
+    }),
+    Case('timeline_page', login=True),
+    Case('timeline_page', data={'sort': '-test_score'}, label='timeline_page (by score)'),
+    Case('admission_stats'),
+    Case('admission_stats', data={'university': 'University 3', 'count_type': 'admissions'}, label='admission_stats (filtered)'),
+    Case('get_comments', args=lambda ctx: [ctx.post.pk]),
+    Case('add_comment', 'post', args=lambda ctx: [ctx.post.pk], data={'content': 'Congrats!'}, login=True, json=True),
+    Case('add_reply', 'post', args=lambda ctx: [ctx.comment.pk], data={'content': 'Thanks!'}, login=True, json=True),
+    Case('delete_comment', 'post', args=lambda ctx: [ctx.own_comment()], login=True, json=True),
+    Case('like_post', 'post', args=lambda ctx: ctx.unlike(), data={'liked': True}, login=True, json=True),
+    Case('search_posts', data={'q': 'university 3'}, linear=True),
+    Case('autocomplete', data={'field': 'university', 'q': 'univ'}),
+    Case('analytics', linear=True),
+    Case('stats_api', data={'university': 'University 3'}),
+    Case('export', args=['posts'], data={'university': 'University 3'}, linear=True),
+    Case('export', args=['stats'], label='export (stats)'),
+    Case('live_events'),
+    Case('healthz'),
+    Case('metrics'),
+    Case('register'),
+    Case('login'),
+    Case('logout', login=True),
+    Case('account_settings', login=True),
+    Case('delete_account', login=True),
+    Case('activate', args=lambda ctx: ctx.inactive_user()),
+    Case('confirm_comment_notifications', args=lambda ctx: ctx.digest_confirmation()),
+    Case('password_reset'),
+    Case('password_reset_done'),
+    Case('password_reset_confirm', args=lambda ctx: ctx.reset_link()),
+    Case('password_reset_complete'),
+]
+
+
+def uncovered_routes(cases=CASES):
+    """Named routes in ``tracker/urls.py`` that no case requests."""
+    routes = [pattern.name for pattern in urlpatterns if isinstance(pattern, URLPattern) and pattern.name]
+    covered = {case.route for case in cases}
+    return [route for route in routes if route not in covered]
+
+
+def measure(case, ctx, repeat=1):
+    """Return ``(status, queries, median seconds)`` for ``case``, each run starting with a cold cache."""
+    timings = []
+    for run in range(repeat):
+        client = Client()
+        if case.login:
+            client.force_login(ctx.viewer)
+        args = case.args(ctx) if callable(case.args) else case.args
+        data = case.data(ctx) if callable(case.data) else case.data
+        url = reverse(case.route, args=args)
+        request = getattr(client, case.method)
+        kwargs = {'content_type': 'application/json'} if case.json else {}
+        cache.clear()
+        # Repeated runs would otherwise use up the viewer's write allowance.
+        caches['throttle'].clear()
+        # CaptureQueriesContext counts how much the query log grows, and a full log no longer does.
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request(url, data or {}, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - start)
+        if run == 0:
+            status, query_count = response.status_code, len(queries)
+    return status, query_count, statistics.median(timings)
+
+
+def run_budget(scales, repeat=1, cases=CASES, progress=None):
+    """Measure every case at each scale, smallest first. Returns ``{case name: {scale: measurement}}``."""
+    results = {case.name: {} for case in cases}
+    for scale in sorted(scales):
+        seed(scale)
+        ctx = BudgetContext()
+        for case in cases:
+            results[case.name][scale] = measure(case, ctx, repeat)
+        if progress:
+            progress(scale)
+    return results
+
+
+def scaling_problems(results, baseline=None, check_time=True, cases=CASES):
+    """List ``(case name, problem)`` for cases whose cost grows with the data or passed its baseline.
+
+    Cases marked ``linear`` may take longer as the data grows, but their query
+    count must still hold steady.
+    """
+    linear = {case.name for case in cases if case.linear}
+    problems = []
+    for name, by_scale in results.items():
+        scales = sorted(by_scale)
+        counts = [by_scale[scale][1] for scale in scales]
+        if len(set(counts)) > 1:
+            problems.append((name, 'queries grow with rows: ' + ', '.join(map(str, counts))))
+        if not check_time:
+            continue
+        first, last = by_scale[scales[0]][2], by_scale[scales[-1]][2]
+        if name not in linear and last > TIME_FLOOR and last > first * TIME_GROWTH:
+            problems.append((name, f'time grows with rows: {first * 1000:.1f}ms to {last * 1000:.1f}ms'))
+        for scale in scales:
+            recorded = (baseline or {}).get(name, {}).get(str(scale))
+            seconds = by_scale[scale][2]
+            if recorded is not None and seconds > recorded * (1 + TIME_TOLERANCE) + TIME_FLOOR:
+                problems.append((name, f'{seconds * 1000:.1f}ms at {scale} rows, baseline {recorded * 1000:.1f}ms'))
+    return problems
+
+
+def baseline_from(results):
+    return {name: {str(scale): round(seconds, 4) for scale, (_, _, seconds) in by_scale.items()}
+            for name, by_scale in results.items()}
+
+
+def report(results, problems=()):
+    """Plain-text table of status, queries and median time per case and scale, then the problems."""
+    scales = sorted({scale for by_scale in results.values() for scale in by_scale})
+    flagged = {name for name, _ in problems}
+    width = max(len(name) for name in results) + 2
+    lines = [' ' * width + ''.join(f'{scale:>22}' for scale in scales)]
+    for name, by_scale in results.items():
+        cells = ''.join(
+            f'{f"{status} {queries:>3}q {seconds * 1000:7.1f}ms":>22}'
+            for status, queries, seconds in (by_scale[scale] for scale in scales)
+        )
+        lines.append(f'{name:<{width}}{cells}{"  !" if name in flagged else ""}')
+    lines += [f'! {name}: {problem}' for name, problem in problems]
+    return '\n'.join(lines)
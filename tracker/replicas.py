@@ -0,0 +1,238 @@
+"""Send read-only views to read replicas.
+
+Views decorated with ``read_replica`` run their GET and HEAD queries on one of
+``DATABASE_REPLICAS``; everything else, and every write, uses ``default``.
+A request that writes pins its browser to the primary for
+``REPLICA_STICKY_SECONDS`` through a cookie, so users see their own posts,
+comments and likes even while the replicas lag. A replica that fails is
+skipped for ``REPLICA_RETRY_SECONDS`` and the view is rerun on the primary;
+streamed rows read through ``resume_on_primary`` continue there instead.
+"""
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Longer than the replicas are expected to lag behind the primary.
+REPLICA_STICKY_SECONDS = 10
+REPLICA_RETRY_SECONDS = 30
+STICKY_COOKIE = 'read_primary'
+
+# alias -> time.monotonic() before which the replica is not used.
+_down_until = {}
+_read_alias = contextvars.ContextVar('tracker_read_alias', default=None)
+
+
+class WriteTracker:
+    def __init__(self):
+        self.wrote = False
+
+
+_writes = contextvars.ContextVar('tracker_writes', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def mark_down(alias):
+    _down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', REPLICA_RETRY_SECONDS)
+
+
+def choose_replica(request):
+    """The replica alias to serve ``request`` from, or ``None`` for the primary."""
+    if request.method not in ('GET', 'HEAD') or STICKY_COOKIE in request.COOKIES:
+        return None
+    now = time.monotonic()
+    healthy = [alias for alias in replicas() if _down_until.get(alias, 0) <= now]
+    return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        writes = _writes.get()
+        if writes is not None:
+            writes.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+@contextmanager
+def primary_reads():
+    """Send the block's reads to the primary, even inside a ``read_replica`` view."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def reading_replica():
+    return _read_alias.get() is not None
+
+
+def resume_on_primary(rows, resume):
+    """Yield ``rows``, finishing on the primary if the replica they are read from fails part way.
+
+    By then a streaming response has sent some of its content, so the view
+    cannot be rerun; ``resume(last)`` returns the rows that follow ``last``,
+    the last row yielded (``None`` if there was none).
+    """
+    alias = _read_alias.get()
+    rows, last = iter(rows), None
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except (OperationalError, InterfaceError) as e:
+            if alias is None:
+                raise
+            _fall_back(alias, e)
+            break
+        last = row
+        yield row
+
+    def resumed():
+        yield from resume(last)
+
+    yield from _routed(None, resumed())
+
+
+def _routed(alias, chunks):
+    """Iterate a streaming response's chunks with reads still routed to ``alias``."""
+    chunks = iter(chunks)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+async def _arouted(alias, chunks):
+    """``_routed`` for async streaming responses."""
+    chunks = aiter(chunks)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = await anext(chunks)
+        except StopAsyncIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+def _finish(response, alias):
+    # Template responses render lazily and streaming ones query as they are
+    # iterated, both after the view has returned.
+    if getattr(response, 'is_rendered', True) is False:
+        response.render()
+    if getattr(response, 'streaming', False):
+        routed = _arouted if response.is_async else _routed
+        response.streaming_content = routed(alias, response.streaming_content)
+    return response
+
+
+def _fall_back(alias, error):
+    mark_down(alias)
+    registry.inc('tracker_replica_fallbacks_total', {'database': alias})
+    logger.warning("Read replica %s failed, using the primary: %s", alias, error)
+
+
+def read_replica(view):
+    """Run ``view``'s reads on a replica when the request allows it.
+
+    Apply it outside ``cache_anonymous_response``, which has to render the
+    responses it caches itself.
+    """
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            alias = choose_replica(request)
+            if alias is None:
+                return await view(request, *args, **kwargs)
+            token = _read_alias.set(alias)
+            try:
+                return _finish(await view(request, *args, **kwargs), alias)
+            except (OperationalError, InterfaceError) as e:
+                _fall_back(alias, e)
+            finally:
+                _read_alias.reset(token)
+            return await view(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            alias = choose_replica(request)
+            if alias is None:
+                return view(request, *args, **kwargs)
+            token = _read_alias.set(alias)
+            try:
+                return _finish(view(request, *args, **kwargs), alias)
+            except (OperationalError, InterfaceError) as e:
+                _fall_back(alias, e)
+            finally:
+                _read_alias.reset(token)
+            return view(request, *args, **kwargs)
+    return wraps(view)(wrapper)
+
+
+class ReplicaStickinessMiddleware:
+    """Pin a browser to the primary for a while after any of its requests writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        writes = WriteTracker()
+        token = _writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            _writes.reset(token)
+        return self.pin(response, writes)
+
+    async def __acall__(self, request):
+        writes = WriteTracker()
+        token = _writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _writes.reset(token)
+        return self.pin(response, writes)
+
+    def pin(self, response, writes):
+        if writes.wrote and replicas():
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', REPLICA_STICKY_SECONDS),
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        return response
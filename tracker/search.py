@@ -0,0 +1,159 @@
+import difflib
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .caching import get_or_build
+from .models import AdmissionPost
+from .names import NAME_FIELDS, normalize_name
+from .stats import stats_facets
+
+SEARCH_FIELDS = ('university', 'major', 'notes', 'post_grad_plans')
+AUTOCOMPLETE_FIELDS = {'university': 'universities', 'major': 'majors'}
+
+# Must stay identical to the expression indexed by migration 0005 so PostgreSQL can use it.
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(university, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(major, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(post_grad_plans, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(notes, '')), 'C')"
+)
+PG_QUERY = "websearch_to_tsquery('english', %s)"
+
+FTS_TABLE = 'tracker_admissionpost_fts'
+FTS_VOCAB_TABLE = 'tracker_admissionpost_fts_vocab'
+FTS_COLUMNS = ', '.join(SEARCH_FIELDS)
+FTS_NEW_VALUES = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+FTS_OLD_VALUES = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+# bm25 column weights, in SEARCH_FIELDS order.
+FTS_WEIGHTS = '10.0, 10.0, 1.0, 5.0'
+
+SQLITE_SEARCH_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({FTS_COLUMNS}, "
+    f"content='tracker_admissionpost', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tracker_admissionpost BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tracker_admissionpost BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON tracker_admissionpost BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD_VALUES}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW_VALUES}); END",
+]
+
+
+def install_sqlite_search(connection):
+    """Create the FTS5 index and its sync triggers, then reindex.
+
+    Safe to repeat: SQLite drops a table's triggers whenever a migration
+    rebuilds it, so this also runs after every ``migrate``.
+    """
+    with connection.cursor() as cursor:
+        for statement in SQLITE_SEARCH_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_search_schema(using='default', **kwargs):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_sqlite_search(connection)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_posts(query, limit=20, using='default'):
+    """Return up to ``limit`` posts matching ``query``, best match first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    vendor = connections[using].vendor
+    if vendor == 'postgresql':
+        return list(_postgres_search(query, limit, using))
+    if vendor == 'sqlite':
+        return _sqlite_search(terms, limit, using)
+    condition = Q()
+    for term in terms:
+        condition &= Q(*[Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS], _connector=Q.OR)
+    return list(AdmissionPost.objects.using(using).filter(condition)[:limit])
+
+
+def _postgres_search(query, limit, using):
+    # The trigram operators let misspelled university and major names still match.
+    matches = RawSQL(
+        f"({PG_DOCUMENT}) @@ {PG_QUERY} OR university %% %s OR major %% %s",
+        [query, query, query],
+        output_field=BooleanField(),
+    )
+    rank = RawSQL(
+        f"ts_rank({PG_DOCUMENT}, {PG_QUERY}) + greatest(similarity(university, %s), similarity(major, %s))",
+        [query, query, query],
+        output_field=FloatField(),
+    )
+    return AdmissionPost.objects.using(using).filter(matches).annotate(rank=rank).order_by('-rank', '-id')[:limit]
+
+
+def _sqlite_search(terms, limit, using):
+    connection = connections[using]
+    ids = _fts_match(connection, ' '.join(f'"{term}"*' for term in terms), limit)
+    if not ids:
+        corrected = [_closest_term(connection, term) for term in terms]
+        if corrected != terms:
+            ids = _fts_match(connection, ' OR '.join(f'"{term}"*' for term in corrected), limit)
+    posts = AdmissionPost.objects.using(using).in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def _fts_match(connection, expression, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {FTS_WEIGHTS}) LIMIT %s",
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _closest_term(connection, term):
+    # Typos rarely hit the first letter, which keeps the vocabulary scan small.
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT term FROM {FTS_VOCAB_TABLE} WHERE term >= %s AND term < %s", [term[0], chr(ord(term[0]) + 1)])
+        vocabulary = [row[0] for row in cursor.fetchall()]
+    matches = difflib.get_close_matches(term, vocabulary, n=1, cutoff=0.75)
+    return matches[0] if matches else term
+
+
+def known_aliases(field):
+    """``(alias, canonical name)`` pairs for the names in the stats, cached until posts change."""
+    _, _, alias_model = NAME_FIELDS[field]
+
+    def build():
+        aliases = alias_model.objects.filter(**{f'{field}__stats_rollups__isnull': False}).distinct()
+        return list(aliases.order_by('alias').values_list('alias', f'{field}__name'))
+    return get_or_build('name_aliases', ['posts'], build, field)
+
+
+def autocomplete(field, prefix, limit=10):
+    """Suggest known university or major names for ``prefix`` from the cached stats facets and aliases."""
+    prefix = prefix.strip().lower()
+    values = stats_facets()[AUTOCOMPLETE_FIELDS[field]]
+    if not prefix:
+        return values[:limit]
+    starts = [value for value in values if value.lower().startswith(prefix)]
+    contains = [value for value in values if prefix in value.lower() and value not in starts]
+    suggestions = (starts + contains)[:limit]
+    key = normalize_name(prefix)
+    if key and len(suggestions) < limit:
+        for alias, name in known_aliases(field):
+            if alias.startswith(key) and name not in suggestions:
+                suggestions.append(name)
+    if len(suggestions) < limit:
+        lowered = {value.lower(): value for value in values}
+        for match in difflib.get_close_matches(prefix, lowered, n=limit, cutoff=0.6):
+            if lowered[match] not in suggestions:
+                suggestions.append(lowered[match])
+    return suggestions[:limit]
@@ -0,0 +1,21 @@
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+SESSION_PURGE_BATCH_SIZE = 1000
+
+
+def purge_expired_sessions(batch_size=SESSION_PURGE_BATCH_SIZE):
+    """Delete expired rows from ``django_session`` and return how many went.
+
+    Unlike ``clearsessions``, which issues one DELETE for every expired row,
+    this works through them in short batches on the expire_date index, so a
+    large backlog never holds locks against logins for long. Cached sessions
+    expire from the cache on their own.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(Session.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
@@ -0,0 +1,131 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_version_on_commit
+from .likes import recount_likes
+from .live import publish
+from .models import AdmissionPost, Comment, Major, MajorAlias, University, UniversityAlias, User
+from .names import Canonicalizer
+from .stats import ROLLUP_KEY, add_post_delta, apply_rollup_deltas, new_rollup_deltas, post_values
+
+
+@receiver(pre_save, sender=AdmissionPost)
+def canonicalize_post_names(sender, instance, raw=False, **kwargs):
+    # Runs before remember_rollup_values, so the rollup sees the new keys.
+    if not raw:
+        Canonicalizer().canonicalize([instance])
+
+
+@receiver(pre_save, sender=AdmissionPost)
+def remember_rollup_values(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and not instance._state.adding and instance.pk:
+        instance._rollup_previous = (
+            AdmissionPost.objects.filter(pk=instance.pk).values(*ROLLUP_KEY, 'status').first()
+        )
+
+
+@receiver(post_save, sender=AdmissionPost)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = new_rollup_deltas()
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        add_post_delta(deltas, previous, -1)
+    add_post_delta(deltas, post_values(instance), 1)
+    apply_rollup_deltas(deltas)
+
+
+@receiver(post_delete, sender=AdmissionPost)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    deltas = new_rollup_deltas()
+    add_post_delta(deltas, post_values(instance), -1)
+    apply_rollup_deltas(deltas)
+
+
+@receiver(post_save, sender=AdmissionPost)
+@receiver(post_delete, sender=AdmissionPost)
+def invalidate_post_caches(sender, **kwargs):
+    bump_version_on_commit('posts')
+
+
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=University)
+@receiver(post_save, sender=Major)
+@receiver(post_delete, sender=Major)
+@receiver(post_save, sender=UniversityAlias)
+@receiver(post_delete, sender=UniversityAlias)
+@receiver(post_save, sender=MajorAlias)
+@receiver(post_delete, sender=MajorAlias)
+def invalidate_renamed_names(sender, **kwargs):
+    # Stats rows, facets and autocomplete show the canonical names.
+    bump_version_on_commit('posts')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_caches(sender, **kwargs):
+    bump_version_on_commit('comments')
+
+
+@receiver(pre_save, sender=User)
+def remember_display_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Signups, activations and logins save users without renaming anyone.
+    instance._renamed = False
+    if raw or instance._state.adding or (update_fields is not None and 'anonymous_username' not in update_fields):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list('anonymous_username', flat=True).first()
+    instance._renamed = stored != instance.anonymous_username
+
+
+@receiver(post_save, sender=User)
+def invalidate_display_names(sender, instance, created=False, **kwargs):
+    # Comments show the author's display name.
+    if not created and getattr(instance, '_renamed', False):
+        bump_version_on_commit('users')
+
+
+@receiver(m2m_changed, sender=AdmissionPost.likes.through)
+def recount_changed_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    # tracker.likes.set_like writes the through table directly; this covers
+    # everything else (admin forms, shell) that goes through the relation.
+    if action == 'pre_clear' and reverse:
+        instance._cleared_like_post_ids = list(instance.liked_posts.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            post_ids = [instance.pk]
+        elif action == 'post_clear':
+            post_ids = getattr(instance, '_cleared_like_post_ids', [])
+        else:
+            post_ids = pk_set
+        recount_likes(post_ids)
+
+
+@receiver(pre_delete, sender=User)
+def forget_deleted_user_likes(sender, instance, **kwargs):
+    if AdmissionPost.objects.filter(likes=instance).update(likes_count=F('likes_count') - 1):
+        bump_version_on_commit('likes')
+
+
+@receiver(post_save, sender=AdmissionPost)
+def publish_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        publish('post', {
+            'id': instance.pk,
+            'university': instance.university,
+            'major': instance.major,
+            'status': instance.get_status_display(),
+        })
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        publish('comment', {
+            'id': instance.pk,
+            'post_id': instance.post_id,
+            'parent_id': instance.parent_id,
+            'comment_count': Comment.objects.filter(post_id=instance.post_id).count(),
+        })
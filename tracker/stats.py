@@ -0,0 +1,260 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+
+from .caching import get_or_build
+from .models import AdmissionPost, AdmissionStatsRollup, Major, University
+
+ROLLUP_KEY = ('canonical_university_id', 'canonical_major_id', 'degree_type', 'year', 'term')
+# Shown for posts whose name normalizes to nothing (e.g. "!!!"), which have no canonical key.
+UNKNOWN_NAME = 'Unknown'
+# Display names for the canonical keys, joined in when rows are read.
+ROLLUP_NAMES = {
+    'university': Coalesce('canonical_university__name', Value(UNKNOWN_NAME)),
+    'major': Coalesce('canonical_major__name', Value(UNKNOWN_NAME)),
+}
+
+GROUP_COUNTERS = {group: f'{group}_count' for group in AdmissionPost.STATUS_GROUPS}
+COUNTER_FIELDS = list(GROUP_COUNTERS.values()) + ['total_count']
+
+STATUS_COUNTERS = {
+    status: GROUP_COUNTERS[group]
+    for group, statuses in AdmissionPost.STATUS_GROUPS.items()
+    for status in statuses
+}
+
+
+def rollup_key(values):
+    return tuple(values[field] for field in ROLLUP_KEY)
+
+
+def new_rollup_deltas():
+    return defaultdict(Counter)
+
+
+def add_post_delta(deltas, values, sign):
+    """Add ``sign`` to the counters a post with these field ``values`` contributes to."""
+    counters = deltas[rollup_key(values)]
+    counters['total_count'] += sign
+    counter = STATUS_COUNTERS.get(values['status'])
+    if counter:
+        counters[counter] += sign
+
+
+def post_values(post):
+    return {field: getattr(post, field) for field in ROLLUP_KEY + ('status',)}
+
+
+def apply_rollup_deltas(deltas):
+    """Apply ``{rollup key: Counter(field=delta)}`` to the rollup table with atomic F() updates."""
+    with transaction.atomic():
+        for key, counters in deltas.items():
+            counters = {field: delta for field, delta in counters.items() if delta}
+            if not counters:
+                continue
+            rows = AdmissionStatsRollup.objects.filter(**dict(zip(ROLLUP_KEY, key)))
+            updates = {field: F(field) + delta for field, delta in counters.items()}
+            if not rows.update(**updates) and counters.get('total_count', 0) > 0:
+                try:
+                    with transaction.atomic():
+                        AdmissionStatsRollup.objects.create(**dict(zip(ROLLUP_KEY, key)), **counters)
+                except IntegrityError:
+                    # Another writer created the row first, so it can be updated now.
+                    rows.update(**updates)
+            if counters.get('total_count', 0) < 0:
+                rows.filter(total_count__lte=0).delete()
+
+
+def aggregate_posts(queryset):
+    return queryset.order_by().values(*ROLLUP_KEY).annotate(
+        total_count=Count('id'),
+        **{
+            counter: Count('id', filter=Q(status__in=AdmissionPost.STATUS_GROUPS[group]))
+            for group, counter in GROUP_COUNTERS.items()
+        }
+    )
+
+
+def rebuild_rollup(batch_size=1000):
+    """Recompute the whole rollup table from ``AdmissionPost``. Returns the number of rows."""
+    with transaction.atomic():
+        AdmissionStatsRollup.objects.all().delete()
+        rows = AdmissionStatsRollup.objects.bulk_create(
+            (AdmissionStatsRollup(**row) for row in aggregate_posts(AdmissionPost.objects.all())),
+            batch_size=batch_size,
+        )
+    return len(rows)
+
+
+def stats_facets():
+    """Distinct universities, majors and years for the stats filters, cached until posts change."""
+    def build():
+        rollup = AdmissionStatsRollup.objects.order_by()
+        return {
+            'universities': list(
+                University.objects.filter(stats_rollups__isnull=False).distinct().values_list('name', flat=True)
+            ),
+            'majors': list(Major.objects.filter(stats_rollups__isnull=False).distinct().values_list('name', flat=True)),
+            'years': list(rollup.values_list('year', flat=True).distinct().order_by('-year')),
+        }
+    return get_or_build('stats_facets', ['posts'], build)
+
+
+def matching_ids(model, fragment):
+    """Ids of the entities whose name, or any spelling folded into them, contains ``fragment``."""
+    from .names import normalize_name  # tracker.names builds on this module.
+
+    matches = Q(name__icontains=fragment)
+    alias = normalize_name(fragment)
+    if alias:
+        matches |= Q(aliases__alias__icontains=alias)
+    return list(model.objects.filter(matches).distinct().values_list('pk', flat=True))
+
+
+STATS_PARAMS = ('university', 'major', 'degree_type', 'year', 'term', 'count_type')
+
+
+class StatsFilterError(ValueError):
+    pass
+
+
+# Bounds for the year filter; anything outside cannot match a post.
+MIN_FILTER_YEAR, MAX_FILTER_YEAR = 1900, 2100
+
+
+def clean_stats_params(params):
+    """Validate the stats filters in ``params``, returning them as a dict of strings with '' for unset.
+
+    Raises ``StatsFilterError`` with a message for the client on bad input.
+    """
+    cleaned = {name: (params.get(name) or '').strip() for name in STATS_PARAMS}
+    for name in ('university', 'major'):
+        if len(cleaned[name]) > 100:
+            raise StatsFilterError(f"The {name} filter is longer than 100 characters.")
+    choices = {
+        'degree_type': dict(AdmissionPost.DEGREE_CHOICES),
+        'term': dict(AdmissionPost.TERM_CHOICES),
+        'count_type': {'all': None, **AdmissionPost.STATUS_GROUPS},
+    }
+    for name, allowed in choices.items():
+        if cleaned[name] and cleaned[name] not in allowed:
+            raise StatsFilterError(f"Unknown {name}: {cleaned[name]!r}.")
+    if cleaned['year']:
+        try:
+            year = int(cleaned['year'])
+        except ValueError:
+            raise StatsFilterError(f"The year must be a number, not {cleaned['year']!r}.")
+        if not MIN_FILTER_YEAR <= year <= MAX_FILTER_YEAR:
+            raise StatsFilterError(f"The year must be between {MIN_FILTER_YEAR} and {MAX_FILTER_YEAR}.")
+        cleaned['year'] = str(year)
+    return cleaned
+
+
+def stats_filters(params):
+    """Translate the stats page query parameters into field lookups shared by posts and the rollup.
+
+    Name fragments are resolved to canonical ids up front: the planner can
+    walk the rollup key indexes for a list of ids, but not for a join it
+    cannot estimate. Raises ``StatsFilterError`` on bad input.
+    """
+    params = clean_stats_params(params)
+    filters = {}
+    if params['university']:
+        filters['canonical_university__in'] = matching_ids(University, params['university'])
+    if params['major']:
+        filters['canonical_major__in'] = matching_ids(Major, params['major'])
+    if params['degree_type']:
+        filters['degree_type'] = params['degree_type']
+    if params['year']:
+        filters['year'] = int(params['year'])
+    if params['term']:
+        filters['term'] = params['term']
+    return filters
+
+
+def selected_group(params):
+    count_type = params.get('count_type', 'all')
+    return count_type if count_type in AdmissionPost.STATUS_GROUPS else None
+
+
+def filter_posts(params):
+    queryset = AdmissionPost.objects.filter(**stats_filters(params))
+    group = selected_group(params)
+    if group:
+        queryset = queryset.filter(status__in=AdmissionPost.STATUS_GROUPS[group])
+    return queryset
+
+
+def stats_queryset(params):
+    """The rollup rows ``stats_rows`` reads for the given filters."""
+    queryset = AdmissionStatsRollup.objects.filter(**stats_filters(params)).values(
+        *ROLLUP_KEY, *COUNTER_FIELDS, **ROLLUP_NAMES
+    )
+    group = selected_group(params)
+    if group:
+        queryset = queryset.filter(**{f'{GROUP_COUNTERS[group]}__gt': 0})
+    return queryset
+
+
+def stats_rows(params, chunk_size=None):
+    """Aggregated stats rows for the given filters, read from the rollup table.
+
+    With ``chunk_size`` the rows are streamed from a server-side cursor.
+    """
+    queryset = stats_queryset(params)
+    group = selected_group(params)
+    rows = queryset.iterator(chunk_size=chunk_size) if chunk_size else queryset
+    if not group:
+        return rows
+    # Only the selected group is counted, so it is also the total.
+    counter = GROUP_COUNTERS[group]
+    zeroed = {field: 0 for field in GROUP_COUNTERS.values() if field != counter}
+    return (dict(row, **zeroed, total_count=row[counter]) for row in rows)
+
+
+# Columns of ``stats_table``; the string ones are dictionary-encoded.
+TABLE_STRING_COLUMNS = ('university', 'major', 'degree_type', 'term')
+TABLE_COLUMNS = TABLE_STRING_COLUMNS + ('year',) + tuple(COUNTER_FIELDS)
+
+
+def stats_params(params):
+    """The cleaned stats filters in ``params`` as a hashable, ordered tuple; anything else is ignored."""
+    return tuple(clean_stats_params(params).items())
+
+
+def encode_table(rows):
+    """Turn stats rows into parallel column lists, with each string column stored as indexes into a dictionary."""
+    dictionaries = {name: {} for name in TABLE_STRING_COLUMNS}
+    columns = {name: [] for name in TABLE_COLUMNS}
+    for row in rows:
+        for name in TABLE_STRING_COLUMNS:
+            codes = dictionaries[name]
+            columns[name].append(codes.setdefault(row[name], len(codes)))
+        for name in TABLE_COLUMNS[len(TABLE_STRING_COLUMNS):]:
+            columns[name].append(row[name])
+    return {
+        'rows': len(columns['year']),
+        'dictionaries': {name: list(codes) for name, codes in dictionaries.items()},
+        'columns': columns,
+    }
+
+
+def decode_table(table):
+    """Yield ``encode_table``'s rows back as dicts."""
+    dictionaries, columns = table['dictionaries'], table['columns']
+    for i in range(table['rows']):
+        row = {name: columns[name][i] for name in TABLE_COLUMNS}
+        for name in TABLE_STRING_COLUMNS:
+            row[name] = dictionaries[name][row[name]]
+        yield row
+
+
+def stats_table(params):
+    """Column-oriented stats rows for the filters in ``params``, cached until posts change.
+
+    Shared by the stats page and ``/api/stats/``; see ``encode_table``.
+    """
+    params = stats_params(params)
+    return get_or_build('stats_table', ['posts'], lambda: encode_table(stats_rows(dict(params))), params)
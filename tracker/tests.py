@@ -1,6 +1,52 @@
-from django.test import TestCase, Client
+import asyncio
+import csv
+import json
+import os
+import re
+import runpy
+import shutil
+import smtplib
+import subprocess
+import tempfile
+from datetime import timedelta
+from importlib.util import find_spec
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import AdmissionPost
+from django.utils import timezone
+from . import health, live, metrics, query_budget
+from .analytics import analytics_queryset
+from .assets import MINIFIERS, StaticFilesMiddleware
+from .caching import MODIFIED_KEY, bump_version, get_versions
+from .comments import COMMENT_PAGE_SIZE
+from .exports import export_chunks, export_queryset
+from .likes import set_like
+from .mail import MAX_ATTEMPTS, digest_confirmation_token, queue_comment_digests, queue_email, send_queued_email
+from .models import AdmissionPost, AdmissionStatsRollup, Comment, Major, OutboundEmail, University, UniversityAlias, User
+from .names import canonicalize_posts, merge_names, normalize_name
+from .replicas import STICKY_COOKIE, _down_until
+from .pagination import keyset_page, keyset_queryset
+from .stats import (
+    COUNTER_FIELDS, ROLLUP_KEY, add_post_delta, aggregate_posts, apply_rollup_deltas, new_rollup_deltas, post_values,
+    rebuild_rollup, rollup_key, stats_queryset,
+)
+from .throttling import take_token
+from .views import TIMELINE_PAGE_SIZE, TIMELINE_SORTS, timeline_queryset
 
 class AdmissionPostModelTest(TestCase):
     def setUp(self):
@@ -53,4 +99,1494 @@ class AdmissionPostViewsTest(TestCase):
         }
         response = self.client.post(self.create_post_url, data=post_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
-        self.assertTrue(AdmissionPost.objects.filter(major='Data Science').exists())
\ No newline at end of file
+        self.assertTrue(AdmissionPost.objects.filter(major='Data Science').exists())
+
+def create_post(**overrides):
+    fields = {
+        'degree_type': 'MS',
+        'major': 'Computer Science',
+        'university': 'Test University',
+        'country': 'Test Country',
+        'application_round': 'Fall 2024',
+        'status': 'ACCEPTED',
+        'student_type': 'DOMESTIC',
+    }
+    fields.update(overrides)
+    return AdmissionPost.objects.create(**fields)
+
+
+class AdmissionTimelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='viewer', password='password')
+        self.url = reverse('admission_timeline')
+
+    def seed(self, count):
+        for i in range(count):
+            post = create_post(university=f'University {i}')
+            Comment.objects.create(post=post, user=self.user, content='Congrats!')
+            post.likes.add(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_posts(self):
+        self.client.force_login(self.user)
+        self.seed(2)
+        small = self.count_queries(self.url)
+        self.seed(TIMELINE_PAGE_SIZE + 5)
+        self.assertEqual(self.count_queries(self.url), small)
+
+    def test_pages_follow_cursor_without_overlap(self):
+        self.seed(TIMELINE_PAGE_SIZE + 5)
+        response = self.client.get(self.url)
+        first_page = [post.id for post in response.context['posts']]
+        self.assertEqual(len(first_page), TIMELINE_PAGE_SIZE)
+
+        response = self.client.get(reverse('timeline_page'), {'cursor': response.context['next_cursor']})
+        data = response.json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['html'].count('timeline-item'), 5)
+        for post_id in first_page:
+            self.assertNotIn(f'data-post-id="{post_id}"', data['html'])
+
+    def test_nullable_sort_pages_through_every_post(self):
+        for score in [None, 310, None, 320, 330]:
+            create_post(test_score=score)
+        seen = []
+        cursor = None
+        while True:
+            posts, cursor = keyset_page(timeline_queryset(self.user), 'test_score', cursor, page_size=2)
+            seen.extend(post.test_score for post in posts)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [310, 320, 330, None, None])
+
+    def test_liked_flag_and_counts(self):
+        self.seed(1)
+        self.client.force_login(self.user)
+        post = self.client.get(self.url).context['posts'][0]
+        self.assertTrue(post.liked)
+        self.assertEqual(post.likes_count, 1)
+        self.assertEqual(post.comment_count, 1)
+
+    def test_unknown_sort_falls_back_to_recent(self):
+        self.seed(1)
+        response = self.client.get(self.url, {'sort': 'user__password'})
+        self.assertEqual(response.context['sort'], '-created_at')
+
+
+class AdmissionStatsRollupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def rollup(self):
+        return list(AdmissionStatsRollup.objects.values(*ROLLUP_KEY, *COUNTER_FIELDS))
+
+    def assertRollupMatchesPosts(self):
+        expected = sorted(aggregate_posts(AdmissionPost.objects.all()), key=rollup_key)
+        self.assertEqual(sorted(self.rollup(), key=rollup_key), expected)
+
+    def test_create_edit_and_delete_keep_rollup_in_sync(self):
+        accepted = create_post(status='ACCEPTED')
+        create_post(status='REJECTED')
+        create_post(status='NOTES')
+        self.assertRollupMatchesPosts()
+
+        accepted.status = 'WAITLISTED'
+        accepted.save()
+        self.assertRollupMatchesPosts()
+
+        accepted.university = 'Other University'
+        accepted.save()
+        self.assertRollupMatchesPosts()
+
+        accepted.delete()
+        self.assertRollupMatchesPosts()
+        self.assertFalse(AdmissionStatsRollup.objects.filter(canonical_university__name='Other University').exists())
+
+    def test_null_keys_share_one_row(self):
+        values = {'canonical_university_id': None, 'canonical_major_id': None, 'degree_type': 'MS', 'year': 2024,
+                  'term': 'FALL', 'status': 'ACCEPTED'}
+        for _ in range(2):
+            deltas = new_rollup_deltas()
+            add_post_delta(deltas, values, 1)
+            apply_rollup_deltas(deltas)
+        self.assertEqual(list(AdmissionStatsRollup.objects.values_list('total_count', flat=True)), [2])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AdmissionStatsRollup.objects.create(degree_type='MS', year=2024, term='FALL', total_count=1)
+
+    def test_rebuild_command_repairs_drift(self):
+        create_post(status='ACCEPTED')
+        AdmissionStatsRollup.objects.update(admissions_count=40, total_count=41)
+        call_command('rebuild_stats_rollup', stdout=StringIO())
+        self.assertRollupMatchesPosts()
+
+    def test_stats_view_reads_rollup(self):
+        create_post(status='ACCEPTED')
+        create_post(status='REJECTED')
+        create_post(status='ACCEPTED', university='Elsewhere')
+        response = self.client.get(reverse('admission_stats'), {'university': 'test'})
+        rows = list(response.context['admissions'])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['admissions_count'], rows[0]['rejections_count'], rows[0]['total_count']), (1, 1, 2))
+
+        response = self.client.get(reverse('admission_stats'), {'count_type': 'rejections'})
+        rows = list(response.context['admissions'])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['admissions_count'], rows[0]['rejections_count'], rows[0]['total_count']), (0, 1, 1))
+
+
+class StatsFacetCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('admission_stats')
+
+    def test_facets_are_served_from_cache(self):
+        create_post(university='Alpha', year=2024)
+        # Signed in, so the page is rendered rather than served from the anonymous response cache.
+        self.client.force_login(User.objects.create_user(username='analyst', password='password'))
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['universities'], ['Alpha'])
+        self.assertEqual(response.context['years'], [2024])
+        # Facets and rows are cached too, so only the user is read; the session comes from its cache.
+        self.assertEqual(len(queries), 1)
+
+    def test_post_changes_invalidate_facets(self):
+        create_post(university='Alpha')
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_post(university='Beta')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['universities'], ['Alpha', 'Beta'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdmissionPost.objects.filter(university='Alpha').delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['universities'], ['Beta'])
+
+
+class StatsApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('stats_api')
+        create_post(university='Alpha', major='Math', year=2024, term='FALL')
+        create_post(university='Alpha', major='Physics', year=2024, term='FALL', status='REJECTED')
+        create_post(university='Beta', major='Math', year=2023, term='SPRING')
+
+    def test_columns_are_dictionary_encoded(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['rows'], 3)
+        self.assertEqual(data['dictionaries']['university'], ['Alpha', 'Beta'])
+        self.assertEqual(data['dictionaries']['major'], ['Math', 'Physics'])
+        columns = data['columns']
+        self.assertEqual(columns['university'], [0, 0, 1])
+        self.assertEqual(columns['major'], [0, 1, 0])
+        self.assertEqual(columns['year'], [2024, 2024, 2023])
+        self.assertEqual(columns['admissions_count'], [1, 0, 1])
+        self.assertEqual(columns['rejections_count'], [0, 1, 0])
+        data = self.client.get(self.url, {'university': 'beta', 'ignored': 'x'}).json()
+        self.assertEqual((data['rows'], data['dictionaries']['university']), (1, ['Beta']))
+
+    def test_shares_the_stats_page_cache(self):
+        self.client.force_login(User.objects.create_user(username='analyst', password='password'))
+        rows = list(self.client.get(reverse('admission_stats')).context['admissions'])
+        with self.assertNumQueries(0):
+            data = self.client.get(self.url).json()
+        self.assertEqual([row['university'] for row in rows], ['Alpha', 'Alpha', 'Beta'])
+        self.assertEqual([row['total_count'] for row in rows], data['columns']['total_count'])
+
+    def test_etag_and_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_post(university='Gamma')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rows'], 4)
+
+
+class StatsFilterValidationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_post(university='Alpha', year=2024, degree_type='MS')
+
+    def test_bad_filters_are_rejected(self):
+        urls = [reverse('analytics'), reverse('stats_api'), reverse('export', args=['posts']), reverse('export', args=['stats'])]
+        for params, message in [
+            ({'year': 'abc'}, 'year must be a number'),
+            ({'year': '99999'}, 'year must be between'),
+            ({'degree_type': 'XX'}, 'Unknown degree_type'),
+            ({'term': 'fall'}, 'Unknown term'),
+            ({'count_type': 'everything'}, 'Unknown count_type'),
+            ({'university': 'x' * 101}, 'longer than 100'),
+        ]:
+            for url in urls:
+                with self.subTest(url=url, params=params):
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(message, response.json()['error'])
+            with self.subTest(url='admission_stats', params=params):
+                self.assertEqual(self.client.get(reverse('admission_stats'), params).status_code, 400)
+        with self.assertRaisesMessage(CommandError, 'year must be a number'):
+            call_command('export_admissions', 'posts', '--year', 'abc', stdout=StringIO())
+
+    def test_filters_are_normalized(self):
+        data = self.client.get(reverse('stats_api'), {'year': ' 2024 ', 'degree_type': 'MS', 'count_type': 'all'}).json()
+        self.assertEqual(data['rows'], 1)
+        self.assertEqual(self.client.get(reverse('analytics'), {'year': '2024'}).status_code, 200)
+
+
+class PostSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.stanford = create_post(university='Stanford University', major='Computer Science')
+        self.mit = create_post(university='MIT', major='Physics', notes='Also admitted to Stanford')
+        create_post(university='Yale University', major='History')
+
+    def search(self, query):
+        response = self.client.get(reverse('search_posts'), {'q': query})
+        return [result['id'] for result in response.json()['results']]
+
+    def test_ranked_results(self):
+        self.assertEqual(self.search('stanford'), [self.stanford.id, self.mit.id])
+        self.assertEqual(self.search('computer scien'), [self.stanford.id])
+
+    def test_misspelled_terms_still_match(self):
+        self.assertEqual(self.search('stanfrod'), [self.stanford.id, self.mit.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.stanford.major = 'Mathematics'
+        self.stanford.save()
+        self.assertEqual(self.search('mathematics'), [self.stanford.id])
+        self.stanford.delete()
+        self.assertEqual(self.search('mathematics'), [])
+
+    def test_autocomplete(self):
+        url = reverse('autocomplete')
+        response = self.client.get(url, {'field': 'university', 'q': 'stan'})
+        self.assertEqual(response.json()['results'], ['Stanford University'])
+        response = self.client.get(url, {'field': 'major', 'q': 'phisics'})
+        self.assertEqual(response.json()['results'], ['Physics'])
+        response = self.client.get(url, {'field': 'notes', 'q': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanTest(TestCase):
+    """EXPLAIN the hot queries against a seeded database and fail on full-table scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='password')
+        users = User.objects.bulk_create([User(username=f'commenter{i}') for i in range(50)])
+        universities = [f'University {i}' for i in range(25)]
+        statuses = [status for status, _ in AdmissionPost.STATUS_CHOICES]
+        AdmissionPost.objects.bulk_create([
+            AdmissionPost(
+                university=universities[i % 25], major=f'Major {i % 7}', degree_type=['BS', 'MS', 'PHD'][i % 3],
+                year=2020 + i % 6, term=['FALL', 'SPRING'][i % 2], status=statuses[i % len(statuses)],
+                country='Test Country', application_round='Regular', student_type='DOMESTIC',
+                test_score=300 + i % 40 if i % 5 else None,
+            )
+            for i in range(500)
+        ])
+        cls.post = AdmissionPost.objects.order_by('id').first()
+        Comment.objects.bulk_create([
+            Comment(post_id=post_id, user=users[post_id % 50], content='Congrats!')
+            for post_id in AdmissionPost.objects.order_by('id').values_list('id', flat=True)[:200]
+        ])
+        cls.comment = cls.post.comments.first()
+        Comment.objects.create(post=cls.post, user=cls.user, content='Thanks!', parent=cls.comment)
+        canonicalize_posts()
+        rebuild_rollup()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    # Tables that grow with the site. The University and Major name lookups
+    # are left out: they are small, and on PostgreSQL a trigram index serves
+    # their substring search, which SQLite can only answer with a scan.
+    LARGE_TABLES = ('tracker_admissionpost', 'tracker_admissionstatsrollup', 'tracker_comment')
+
+    def full_table_scans(self, queryset):
+        # A sliced query must read its rows in order from an index: a sort
+        # step reads every matching row before the first one comes back.
+        limited = queryset.query.high_mark is not None
+        if connection.vendor == 'postgresql':
+            # Tiny tables are cheaper to scan, so make the planner prefer any usable index.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            plan = queryset.explain()
+            return [
+                line for line in plan.splitlines()
+                if 'Seq Scan' in line or (limited and re.search(r'\bSort\s+\(', line))
+            ]
+        plan = queryset.explain()
+        # Walking a whole index is a full scan too, unless the query is sliced
+        # and stops after the first rows of an index in the requested order.
+        return [
+            line for line in plan.splitlines()
+            if (limited and 'USE TEMP B-TREE' in line)
+            or (match := re.search(r'\bSCAN (\w+)( USING (COVERING )?INDEX)?', line))
+            and match[1] in self.LARGE_TABLES
+            and not (limited and match[2])
+        ]
+
+    def assertUsesIndexes(self, queryset):
+        scans = self.full_table_scans(queryset)
+        self.assertEqual(scans, [], f'Full-table scan in plan for:\n{queryset.query}')
+
+    def test_timeline_pages(self):
+        for sort in TIMELINE_SORTS:
+            with self.subTest(sort=sort):
+                posts, cursor = keyset_page(timeline_queryset(self.user), sort, page_size=TIMELINE_PAGE_SIZE)
+                self.assertUsesIndexes(keyset_queryset(timeline_queryset(self.user), sort)[:TIMELINE_PAGE_SIZE + 1])
+                self.assertUsesIndexes(keyset_queryset(timeline_queryset(self.user), sort, cursor)[:TIMELINE_PAGE_SIZE + 1])
+
+    def test_timeline_comment_prefetch(self):
+        post_ids = list(AdmissionPost.objects.values_list('id', flat=True)[:TIMELINE_PAGE_SIZE])
+        self.assertUsesIndexes(Comment.objects.select_related('user').filter(post_id__in=post_ids))
+
+    def test_comment_queries(self):
+        self.assertUsesIndexes(self.post.comments.order_by('created_at'))
+        self.assertUsesIndexes(self.post.comments.filter(parent__isnull=True).order_by('created_at', 'id'))
+        self.assertUsesIndexes(self.comment.replies.all())
+
+    def test_stats_filters(self):
+        # The querysets the stats page, analytics and exports build for each selective filter.
+        for params in [
+            {'university': 'University 3'},
+            {'major': 'Major 3'},
+            {'university': 'University 3', 'year': '2024'},
+            {'university': 'University 3', 'count_type': 'admissions'},
+            {'degree_type': 'MS'},
+            {'degree_type': 'MS', 'year': '2024', 'term': 'FALL'},
+            {'year': '2024'},
+        ]:
+            with self.subTest(params=params):
+                self.assertUsesIndexes(stats_queryset(params))
+                self.assertUsesIndexes(analytics_queryset(params))
+                self.assertUsesIndexes(export_queryset('stats', params))
+                if 'university' in params or 'major' in params:
+                    # The posts export walks a whole filter in id order; a year alone is too broad to beat that.
+                    self.assertUsesIndexes(export_queryset('posts', params))
+
+    def test_rollup_maintenance(self):
+        key = dict(zip(ROLLUP_KEY, rollup_key(post_values(self.post))))
+        self.assertUsesIndexes(AdmissionStatsRollup.objects.filter(**key))
+        self.assertUsesIndexes(AdmissionPost.objects.filter(pk=self.post.pk).values(*ROLLUP_KEY, 'status'))
+
+
+class BulkImportTest(TestCase):
+    CSV = (
+        "university,major,degree_type,country,status,student_type,year,term,gpa,created_at\n"
+        "Alpha,Physics,MS,USA,ACCEPTED,DOMESTIC,2023,FALL,3.9,2023-03-01 12:00\n"
+        "Alpha,Physics,MS,USA,REJECTED,INTERNATIONAL,2023,FALL,,\n"
+        "Beta,History,XX,USA,ACCEPTED,DOMESTIC,2023,FALL,,\n"
+        "Beta,History,BA,USA,ACCEPTED,DOMESTIC,,,,\n"
+        "Gamma,,BA,USA,MAYBE,DOMESTIC,2024,SPRING,,\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_csv_import_reports_rejected_rows(self):
+        path = self.write('posts.csv', self.CSV)
+        errors_path = path + '.errors.csv'
+        out = StringIO()
+        call_command('import_posts', path, '--chunk-size', '2', '--errors', errors_path, stdout=out)
+        self.assertIn('Imported 3 of 5 rows (2 rejected)', out.getvalue())
+        self.assertEqual(AdmissionPost.objects.count(), 3)
+        beta = AdmissionPost.objects.get(university='Beta')
+        self.assertEqual((beta.year, beta.term, beta.gpa_scale), (2025, 'SPRING', 4.0))
+        with open(errors_path) as f:
+            rejected = list(csv.reader(f))[1:]
+        self.assertEqual({(line, field) for line, field, _ in rejected}, {('4', 'degree_type'), ('6', 'major'), ('6', 'status')})
+
+    def test_import_updates_rollup_and_caches(self):
+        self.client.get(reverse('admission_stats'))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_posts', self.write('posts.csv', self.CSV), stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            AdmissionStatsRollup.objects.get(canonical_university__name='Alpha').total_count, 2
+        )
+        response = self.client.get(reverse('admission_stats'))
+        self.assertEqual(response.context['universities'], ['Alpha', 'Beta'])
+
+    def test_json_lines_import(self):
+        rows = [
+            {'university': 'Alpha', 'major': 'Physics', 'degree_type': 'PHD', 'country': 'USA', 'status': 'INTERVIEW', 'student_type': 'DOMESTIC'},
+            'not an object',
+        ]
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n')
+        err = StringIO()
+        call_command('import_posts', path, stdout=StringIO(), stderr=err)
+        self.assertEqual(AdmissionPost.objects.get().status, 'INTERVIEW')
+        self.assertIn('Line 2', err.getvalue())
+        self.assertIn('Line 3', err.getvalue())
+
+    def test_admin_upload(self):
+        admin_user = User.objects.create_superuser(username='admin', password='password', email='admin@example.com')
+        self.client.force_login(admin_user)
+        upload = SimpleUploadedFile('posts.csv', self.CSV.encode())
+        response = self.client.post(reverse('admin:tracker_admissionpost_import'), {'file': upload, 'format': 'csv'}, follow=True)
+        self.assertEqual(AdmissionPost.objects.count(), 3)
+        self.assertContains(response, 'Imported 3 of 5 rows.')
+        self.assertContains(response, 'Line 4: degree_type')
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_post(university='Alpha', status='ACCEPTED', gpa=3.7, email='private@example.com')
+        create_post(university='Alpha', status='REJECTED')
+        create_post(university='Beta', status='ACCEPTED', degree_type='PHD')
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('export', args=[kind]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_post_csv_uses_stats_filters(self):
+        rows = list(csv.DictReader(StringIO(self.export('posts', university='alp', count_type='admissions').decode())))
+        self.assertEqual([(row['university'], row['status'], row['gpa']) for row in rows], [('Alpha', 'ACCEPTED', '3.7')])
+        self.assertNotIn('email', rows[0])
+
+    def test_stats_csv_matches_stats_page(self):
+        rows = list(csv.DictReader(StringIO(self.export('stats').decode())))
+        page_rows = self.client.get(reverse('admission_stats')).context['admissions']
+        self.assertEqual(
+            [(row['university'], row['total_count']) for row in rows],
+            [(row['university'], str(row['total_count'])) for row in page_rows],
+        )
+
+    async def test_asgi_export_streams_incrementally(self):
+        produced = []
+
+        def spy(*args):
+            for chunk in export_chunks(*args):
+                produced.append(chunk)
+                yield chunk
+
+        with mock.patch('tracker.views.export_chunks', spy):
+            response = await self.async_client.get(reverse('export', args=['posts']))
+            self.assertTrue(response.is_async)
+            content = aiter(response.streaming_content)
+            header = await anext(content)
+            # Only the header has been produced; the rows are still waiting in the cursor.
+            self.assertTrue(header.startswith(b'id,created_at,'))
+            self.assertEqual(len(produced), 1)
+            rest = [chunk async for chunk in content]
+        self.assertEqual(len(produced), 2)
+        self.assertEqual(len(list(csv.reader(StringIO(b''.join(rest).decode())))), 3)
+
+    def test_unknown_export_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('export', args=['users'])).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export', args=['posts']), {'format': 'xlsx'}).status_code, 400)
+
+    @skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet_command(self):
+        import pyarrow.parquet as pq
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'posts.parquet')
+        call_command('export_admissions', 'posts', '--format', 'parquet', '--output', path, '--degree_type', 'MS')
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(sorted(table.column('status').to_pylist()), ['ACCEPTED', 'REJECTED'])
+
+
+class CanonicalNameTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_spellings_share_one_university(self):
+        self.assertEqual(normalize_name('  The University of São Paulo. '), 'university of sao paulo')
+        self.assertEqual(normalize_name('M.I.T.'), 'mit')
+        first = create_post(university='University of Sao Paulo', status='ACCEPTED')
+        second = create_post(university='the university of são paulo', status='REJECTED')
+        self.assertEqual(first.canonical_university_id, second.canonical_university_id)
+        self.assertEqual(University.objects.get().name, 'University of Sao Paulo')
+        rows = list(self.client.get(reverse('admission_stats')).context['admissions'])
+        self.assertEqual([(row['university'], row['total_count']) for row in rows], [('University of Sao Paulo', 2)])
+
+    def test_pass_maps_existing_posts_in_resumable_batches(self):
+        AdmissionPost.objects.bulk_create([
+            AdmissionPost(
+                university=name, major='Physics', degree_type='MS', country='USA', application_round='Regular',
+                status='ACCEPTED', notification_method='Email', student_type='DOMESTIC', year=2024, term='FALL',
+            )
+            for name in ['Stanford', 'stanford', 'STANFORD.', 'Yale']
+        ])
+        rebuild_rollup()
+        ids = list(AdmissionPost.objects.order_by('pk').values_list('pk', flat=True))
+        out = StringIO()
+        call_command('canonicalize_names', '--batch-size', '2', '--start-after', ids[1], stdout=out)
+        self.assertIn('Canonicalized names on 2 posts', out.getvalue())
+        self.assertEqual(AdmissionPost.objects.filter(canonical_university__isnull=True).count(), 2)
+
+        call_command('canonicalize_names', '--batch-size', '2', stdout=StringIO())
+        stanford = University.objects.get(name='STANFORD.')
+        self.assertEqual(stanford.posts.count(), 3)
+        self.assertEqual(Major.objects.get().posts.count(), 4)
+        self.assertEqual(sorted(self.rollup_totals()), [('STANFORD.', 3), ('Yale', 1)])
+        self.assertFalse(AdmissionPost.objects.filter(canonical_university__isnull=True).exists())
+
+    def test_merge_folds_aliases_posts_and_rollup(self):
+        create_post(university='MIT')
+        create_post(university='Massachusetts Institute of Technology')
+        create_post(university='Massachusetts Institute of Technology')
+        target = University.objects.get(name='Massachusetts Institute of Technology')
+        with self.captureOnCommitCallbacks(execute=True):
+            merge_names(target, University.objects.exclude(pk=target.pk))
+        self.assertEqual(list(self.rollup_totals()), [('Massachusetts Institute of Technology', 3)])
+        self.assertEqual(UniversityAlias.objects.get(alias='mit').university, target)
+        self.assertEqual(create_post(university='M.I.T.').canonical_university, target)
+        response = self.client.get(reverse('autocomplete'), {'field': 'university', 'q': 'mit'})
+        self.assertEqual(response.json()['results'], ['Massachusetts Institute of Technology'])
+
+    def test_unnamed_posts_are_labelled_unknown(self):
+        create_post(university='!!!', major='Physics')
+        rows = list(self.client.get(reverse('admission_stats')).context['admissions'])
+        self.assertEqual([(row['university'], row['major']) for row in rows], [('Unknown', 'Physics')])
+        table = self.client.get(reverse('stats_api')).json()
+        self.assertEqual(table['dictionaries']['university'], ['Unknown'])
+
+    def test_filters_match_merged_spellings(self):
+        create_post(university='Univ. of Texas')
+        create_post(university='University of Texas at Austin')
+        target = University.objects.get(name='University of Texas at Austin')
+        with self.captureOnCommitCallbacks(execute=True):
+            merge_names(target, University.objects.exclude(pk=target.pk))
+        for fragment in ('Univ. of Texas', 'univ of texas', 'Texas at Austin'):
+            rows = list(self.client.get(reverse('admission_stats'), {'university': fragment}).context['admissions'])
+            self.assertEqual([(row['university'], row['total_count']) for row in rows],
+                             [('University of Texas at Austin', 2)], fragment)
+
+    def rollup_totals(self):
+        return AdmissionStatsRollup.objects.values_list('canonical_university__name', 'total_count')
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(metrics, 'registry', metrics.Registry()))
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_timed_and_counted_per_view(self):
+        create_post()
+        self.client.get(reverse('admission_timeline'))
+        self.client.get(reverse('admission_timeline'))
+        body = self.scrape()
+        self.assertIn('tracker_http_requests_total{method="GET",status="200",view="admission_timeline"} 2', body)
+        self.assertIn('tracker_http_request_duration_seconds_count{view="admission_timeline"} 2', body)
+        self.assertRegex(body, r'tracker_db_queries_per_request_sum\{view="admission_timeline"\} [1-9]')
+        self.assertRegex(body, r'tracker_template_render_seconds_total\{view="admission_timeline"\} 0\.\d*[1-9]')
+        # The second anonymous request is answered from the response cache.
+        self.assertIn('tracker_cache_requests_total{cache="response:timeline",result="hit"} 1', body)
+
+    def test_slow_requests_and_repeated_queries_are_logged(self):
+        for _ in range(3):
+            create_post()
+
+        def n_plus_one(request):
+            for post in AdmissionPost.objects.all():
+                Comment.objects.filter(post=post).count()
+            return HttpResponse()
+
+        request = RequestFactory().get('/n-plus-one/')
+        request.resolver_match = mock.Mock(view_name='n_plus_one')
+        with override_settings(SLOW_REQUEST_SECONDS=0, N_PLUS_ONE_THRESHOLD=3), \
+                self.assertLogs('tracker.metrics', 'WARNING') as logs:
+            metrics.MetricsMiddleware(n_plus_one)(request)
+        self.assertIn('Slow request: GET /n-plus-one/ (n_plus_one)', logs.output[0])
+        self.assertIn('Possible N+1 in n_plus_one: 3 executions of SELECT COUNT(*)', logs.output[1])
+        self.assertIn('tracker_repeated_queries_total{view="n_plus_one"} 1', self.scrape())
+
+    def test_scrape_merges_worker_files(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        other_worker = metrics.Registry()
+        other_worker.inc('tracker_http_requests_total', {'view': 'healthz', 'method': 'GET', 'status': 200}, 5)
+        with override_settings(METRICS_DIR=directory):
+            other_worker.flush(force=True)
+            os.rename(os.path.join(directory, f'{os.getpid()}.json'), os.path.join(directory, '1.json'))
+            self.client.get(reverse('healthz'))
+            body = self.scrape()
+        self.assertIn('tracker_http_requests_total{method="GET",status="200",view="healthz"} 6', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertIn('# TYPE', self.scrape(HTTP_AUTHORIZATION='Bearer secret'))
+
+
+class QueryBudgetTest(TestCase):
+    def test_every_route_has_a_case(self):
+        self.assertEqual(query_budget.uncovered_routes(), [])
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        results = query_budget.run_budget([10, 1000])
+        problems = query_budget.scaling_problems(results, check_time=False)
+        self.assertEqual(problems, [], '\n' + query_budget.report(results, problems))
+        errors = {name: by_scale[10][0] for name, by_scale in results.items() if by_scale[10][0] >= 400}
+        self.assertEqual(errors, {})
+
+
+class SessionStorageTest(TestCase):
+    def test_signed_in_requests_read_the_session_from_cache(self):
+        user = User.objects.create_user(username='regular', password='password')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('account_settings'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+        # Written through, so a cold cache still finds the session.
+        caches['sessions'].clear()
+        self.assertEqual(self.client.get(reverse('account_settings')).status_code, 200)
+
+    def test_purge_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='current', session_data='', expire_date=now + timedelta(days=1))
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+
+
+class FailingFetchCursor:
+    """A cursor whose result set breaks off after its first batch of rows."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.fetches = 0
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        if self.fetches > 1:
+            raise OperationalError('replica went away')
+        return self.cursor.fetchmany(size)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadReplicaTest(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        caches['throttle'].clear()
+        # Long enough ago for the replica to have caught up.
+        cache.set_many({MODIFIED_KEY.format(name): 0 for name in ('posts', 'comments', 'likes', 'users')}, None)
+        _down_until.clear()
+        self.addCleanup(_down_until.clear)
+        create_post(university='Primary University')
+        # Signals would map names on the primary, so the replica's copy is written directly.
+        AdmissionPost.objects.using('replica').bulk_create([AdmissionPost(
+            degree_type='MS', major='Physics', university='Replica University', country='Test Country',
+            status='ACCEPTED', student_type='DOMESTIC', year=2024, term='FALL',
+        )])
+
+    def test_read_views_use_the_replica(self):
+        response = self.client.get(reverse('admission_timeline'))
+        self.assertContains(response, 'Replica University')
+        self.assertNotContains(response, 'Primary University')
+        self.assertIn('Replica University', self.client.get(reverse('timeline_page')).json()['html'])
+        response = self.client.get(reverse('export', args=['posts']))
+        self.assertIn(b'Replica University', b''.join(response.streaming_content))
+        # Writes still go to the primary.
+        self.assertEqual(AdmissionPost.objects.using('replica').count(), 1)
+
+    def test_writes_pin_the_browser_to_the_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admission_timeline'), {
+                'degree_type': 'MS', 'major': 'CS', 'university': 'New University', 'country': 'USA',
+                'year': 2024, 'term': 'FALL', 'status': 'ACCEPTED', 'student_type': 'DOMESTIC',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertContains(self.client.get(reverse('admission_timeline')), 'New University')
+        # Other browsers read the replica once it can be expected to have caught up.
+        cache.set(MODIFIED_KEY.format('posts'), 0)
+        self.assertNotContains(Client().get(reverse('admission_timeline')), 'New University')
+
+    def test_caches_are_built_from_the_primary_right_after_a_write(self):
+        bump_version('posts')
+        self.assertContains(self.client.get(reverse('admission_timeline')), 'Primary University')
+        table = self.client.get(reverse('stats_api')).json()
+        self.assertEqual(table['dictionaries']['university'], ['Primary University'])
+        # The page cached from the primary is served from then on.
+        cache.set(MODIFIED_KEY.format('posts'), 0)
+        self.assertContains(self.client.get(reverse('admission_timeline')), 'Primary University')
+
+    def test_export_finishes_on_the_primary_if_the_replica_fails(self):
+        create_post(university='Later University')
+        replica = connections['replica']
+        chunked_cursor = replica.chunked_cursor
+        with mock.patch.object(replica, 'chunked_cursor', lambda: FailingFetchCursor(chunked_cursor())), \
+                self.assertLogs('tracker.replicas', 'WARNING'):
+            response = self.client.get(reverse('export', args=['posts']))
+            body = b''.join(response.streaming_content).decode()
+        # The replica's post, then the primary's posts after it.
+        self.assertIn('Replica University', body)
+        self.assertIn('Later University', body)
+        self.assertNotIn('Primary University', body)
+        self.assertIn('replica', _down_until)
+
+    def test_failed_replica_falls_back_to_primary(self):
+        with mock.patch.object(connections['replica'], 'cursor', side_effect=OperationalError('replica down')), \
+                self.assertLogs('tracker.replicas', 'WARNING'):
+            response = self.client.get(reverse('admission_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('replica', _down_until)
+        # Skipped until it is retried, without waiting for it to fail again.
+        self.assertContains(self.client.get(reverse('admission_timeline')), 'Primary University')
+
+
+@override_settings(THROTTLE_RATES={
+    'post': {'user': '2/h', 'ip': '3/h'},
+    'comment': {'user': '2/m', 'ip': '10/m'},
+    'like': {'user': '10/m', 'ip': '10/m'},
+})
+class ThrottleTest(TestCase):
+    def setUp(self):
+        caches['throttle'].clear()
+        self.post = create_post()
+
+    def create(self, client, **extra):
+        return client.post(reverse('admission_timeline'), {
+            'degree_type': 'MS', 'major': 'CS', 'university': 'MIT', 'country': 'USA',
+            'year': 2024, 'term': 'FALL', 'status': 'ACCEPTED', 'student_type': 'DOMESTIC',
+        }, **extra)
+
+    def test_anonymous_posts_are_limited_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.create(self.client).status_code, 302)
+        response = self.create(self.client)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(AdmissionPost.objects.count(), 4)
+        # Another address has its own bucket, and reads are never throttled.
+        self.assertEqual(self.create(self.client, REMOTE_ADDR='10.0.0.2').status_code, 302)
+        self.assertEqual(self.client.get(reverse('admission_timeline')).status_code, 200)
+
+    def test_comments_are_limited_per_user_with_json_error(self):
+        url = reverse('add_comment', args=[self.post.id])
+        body = json.dumps({'content': 'Congrats!'})
+        self.client.force_login(User.objects.create_user(username='chatty', password='password'))
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, body, content_type='application/json').status_code, 200)
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertIn('Retry-After', response)
+        other = Client()
+        other.force_login(User.objects.create_user(username='quiet', password='password'))
+        self.assertEqual(other.post(url, body, content_type='application/json').status_code, 200)
+        self.assertEqual(self.post.comments.count(), 3)
+
+    @override_settings(THROTTLE_RATES={'comment': {'user': '1/m', 'ip': '1/m'}})
+    def test_refused_request_is_not_charged_to_the_user(self):
+        url = reverse('add_comment', args=[self.post.id])
+        body = json.dumps({'content': 'Congrats!'})
+        first, second = Client(), Client()
+        first.force_login(User.objects.create_user(username='first', password='password'))
+        second.force_login(User.objects.create_user(username='second', password='password'))
+        self.assertEqual(first.post(url, body, content_type='application/json').status_code, 200)
+        # The shared address is out of tokens; the second user's own bucket is untouched.
+        self.assertEqual(second.post(url, body, content_type='application/json').status_code, 429)
+        response = second.post(url, body, content_type='application/json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_likes_are_refused_before_the_throttle(self):
+        url = reverse('like_post', args=[self.post.id])
+        for _ in range(11):
+            self.assertEqual(self.client.post(url, '', content_type='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='liker', password='password'))
+        self.assertEqual(self.client.post(url, '', content_type='application/json').status_code, 200)
+
+    def test_bucket_refills_over_the_period(self):
+        start = 6000.0
+        self.assertEqual([take_token('test', '2/m', now=start) for _ in range(2)], [0, 0])
+        # Half a period into the next window, half of this one still counts.
+        self.assertEqual(take_token('test', '2/m', now=start), 90)
+        self.assertEqual(take_token('test', '2/m', now=start + 89), 1)
+        self.assertEqual(take_token('test', '2/m', now=start + 90), 0)
+        self.assertGreater(take_token('test', '2/m', now=start + 90), 0)
+        self.assertEqual(take_token('test', '2/m', now=start + 180), 0)
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    attempts = 0
+
+    def send_messages(self, email_messages):
+        FailingEmailBackend.attempts += 1
+        raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+
+class DroppingEmailBackend(CountingEmailBackend):
+    """Drops the connection once, when the second message is sent."""
+    drops = 0
+
+    def send_messages(self, email_messages):
+        if len(mail.outbox) == 1 and DroppingEmailBackend.drops:
+            DroppingEmailBackend.drops -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(email_messages)
+
+
+class EmailOutboxTest(TestCase):
+    def test_registration_queues_activation_email(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'a-long-Passw0rd',
+            'password2': 'a-long-Passw0rd',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().recipient, 'newcomer@example.com')
+
+        call_command('send_queued_email', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Activate Your Account')
+        self.assertEqual(OutboundEmail.objects.get().status, 'SENT')
+
+    @override_settings(EMAIL_BACKEND='tracker.tests.CountingEmailBackend')
+    def test_batch_reuses_one_connection(self):
+        CountingEmailBackend.opened = 0
+        for i in range(3):
+            queue_email('Hello', 'Body', f'user{i}@example.com')
+        self.assertEqual(send_queued_email(), (3, 0))
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(EMAIL_BACKEND='tracker.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        outbound = queue_email('Hello', 'Body', 'user@example.com')
+        self.assertEqual(send_queued_email(), (0, 1))
+        outbound.refresh_from_db()
+        self.assertEqual((outbound.status, outbound.attempts), ('PENDING', 1))
+        self.assertGreater(outbound.next_attempt_at, timezone.now())
+        self.assertIn('unexpectedly closed', outbound.last_error)
+        # Not due yet, so nothing is retried immediately.
+        self.assertEqual(send_queued_email(), (0, 0))
+
+        for attempt in range(2, MAX_ATTEMPTS + 1):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            send_queued_email()
+        outbound.refresh_from_db()
+        self.assertEqual((outbound.status, outbound.attempts), ('FAILED', MAX_ATTEMPTS))
+
+    @override_settings(EMAIL_BACKEND='tracker.tests.DroppingEmailBackend')
+    def test_dropped_connection_is_reopened_once(self):
+        CountingEmailBackend.opened = 0
+        DroppingEmailBackend.drops = 1
+        for i in range(3):
+            queue_email('Hello', 'Body', f'user{i}@example.com')
+        self.assertEqual(send_queued_email(), (3, 0))
+        self.assertEqual(CountingEmailBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(EMAIL_BACKEND='tracker.tests.FailingEmailBackend')
+    def test_dead_connection_fails_the_rest_of_the_batch(self):
+        FailingEmailBackend.attempts = 0
+        for i in range(3):
+            queue_email('Hello', 'Body', f'user{i}@example.com')
+        self.assertEqual(send_queued_email(), (0, 3))
+        # The first message and its one retry; the others are not tried on a dead connection.
+        self.assertEqual(FailingEmailBackend.attempts, 2)
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts')), {('PENDING', 1)})
+
+    def test_comment_digest(self):
+        author = User.objects.create_user(username='author', password='password')
+        commenter = User.objects.create_user(username='commenter', password='password', anonymous_username='Owl')
+        post = create_post(user=author, notify_comments=True, email='author@example.com', email_confirmed=True)
+        create_post(notify_comments=False, email='quiet@example.com')
+        Comment.objects.create(post=post, user=commenter, content='Congrats!')
+        Comment.objects.create(post=post, user=commenter, content='Which program?')
+        Comment.objects.create(post=post, user=author, content='Thanks!')
+
+        self.assertEqual(queue_comment_digests(), 1)
+        digest = OutboundEmail.objects.get()
+        self.assertEqual(digest.recipient, 'author@example.com')
+        self.assertIn('2 new comments', digest.body)
+        self.assertIn('Owl', digest.body)
+        self.assertNotIn('Thanks!', digest.body)
+        self.assertEqual(queue_comment_digests(), 0)
+
+        # A comment stamped before that digest but committed after it is still sent.
+        late = Comment.objects.create(post=post, user=commenter, content='Late congrats!')
+        Comment.objects.filter(pk=late.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue_comment_digests(), 1)
+        self.assertIn('Late congrats!', OutboundEmail.objects.latest('id').body)
+
+    def subscribe(self, client, email):
+        caches['throttle'].clear()
+        client.post(reverse('admission_timeline'), {
+            'degree_type': 'MS', 'major': 'CS', 'university': 'MIT', 'country': 'USA',
+            'year': 2024, 'term': 'FALL', 'status': 'ACCEPTED', 'student_type': 'DOMESTIC',
+            'notify_comments': 'on', 'email': email,
+        })
+        return AdmissionPost.objects.get(email=email)
+
+    def test_digests_wait_for_a_confirmed_address(self):
+        post = self.subscribe(self.client, 'someone@example.com')
+        self.assertFalse(post.email_confirmed)
+        confirmation = OutboundEmail.objects.get()
+        self.assertEqual(confirmation.recipient, 'someone@example.com')
+        commenter = User.objects.create_user(username='commenter', password='password')
+        Comment.objects.create(post=post, user=commenter, content='Congrats!')
+        self.assertEqual(queue_comment_digests(), 0)
+
+        link = re.search(r'http://testserver(/\S+)', confirmation.body).group(1)
+        self.client.get(link)
+        post.refresh_from_db()
+        self.assertTrue(post.email_confirmed)
+        self.assertEqual(queue_comment_digests(), 1)
+
+    def test_confirmation_links_are_tied_to_the_address(self):
+        post = self.subscribe(self.client, 'someone@example.com')
+        token = digest_confirmation_token(post)
+        AdmissionPost.objects.filter(pk=post.pk).update(email='other@example.com')
+        self.client.get(reverse('confirm_comment_notifications', args=[token]))
+        self.client.get(reverse('confirm_comment_notifications', args=['forged']))
+        post.refresh_from_db()
+        self.assertFalse(post.email_confirmed)
+
+    def test_verified_account_address_needs_no_confirmation(self):
+        user = User.objects.create_user(username='author', password='password', email='author@example.com')
+        user.email_verified = True
+        user.save()
+        self.client.force_login(user)
+        self.assertTrue(self.subscribe(self.client, 'Author@example.com').email_confirmed)
+        self.assertFalse(self.subscribe(self.client, 'elsewhere@example.com').email_confirmed)
+        self.assertEqual(list(OutboundEmail.objects.values_list('recipient', flat=True)), ['elsewhere@example.com'])
+
+
+# Runs a script against stand-ins for the browser globals that record every
+# property read, assignment and call, then calls each callback it registers
+# (event handlers, promise callbacks) the same way, and prints the record.
+JS_TRACE = """
+const vm = require('vm');
+const trace = [], callbacks = [], fakes = new WeakSet();
+function describe(value) {
+    if (fakes.has(value)) return String(value);
+    if (typeof value === 'function') return '<function>';
+    if (typeof value === 'object' && value !== null) {
+        return JSON.stringify(value, (key, item) => key && typeof item === 'function' ? describe(item) : item);
+    }
+    return String(value);
+}
+function fake(path) {
+    const proxy = new Proxy(function () {}, {
+        get(target, prop) {
+            if (prop === Symbol.toPrimitive) return () => path;
+            if (typeof prop === 'symbol' || prop === 'toJSON') return undefined;
+            trace.push(`get ${path}.${prop}`);
+            return fake(`${path}.${prop}`);
+        },
+        set(target, prop, value) {
+            trace.push(`set ${path}.${prop} = ${describe(value)}`);
+            return true;
+        },
+        apply(target, self, args) {
+            trace.push(`call ${path}(${args.map(describe).join(', ')})`);
+            callbacks.push(...args.filter(arg => typeof arg === 'function'));
+            return fake(`${path}()`);
+        },
+        construct(target, args) {
+            trace.push(`new ${path}(${args.map(describe).join(', ')})`);
+            callbacks.push(...args.filter(arg => typeof arg === 'function'));
+            return fake(`new ${path}`);
+        },
+    });
+    fakes.add(proxy);
+    return proxy;
+}
+const globals = {};
+for (const name of ['document', 'window', 'fetch', 'confirm', 'alert', 'console', 'setTimeout',
+                    'EventSource', 'IntersectionObserver', 'URLSearchParams', 'FormData']) {
+    globals[name] = fake(name);
+}
+const run = fn => { try { fn(); } catch (e) { trace.push(`throw ${e.name}`); } };
+run(() => vm.runInNewContext(require('fs').readFileSync(0, 'utf8'), globals));
+for (let i = 0; i < callbacks.length && i < 1000; i++) {
+    run(() => callbacks[i](fake(`arg${i}`)));
+}
+console.log(JSON.stringify(trace));
+"""
+
+
+def js_trace(script):
+    result = subprocess.run(['node', '-e', JS_TRACE], input=script, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def css_rules(source):
+    """Each rule as (enclosing preludes, declarations), ignoring comments and insignificant whitespace."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    rules, preludes = [], []
+    for text, brace in re.findall(r'([^{}]*)([{}])', source):
+        if brace == '{':
+            preludes.append(re.sub(r' ?([,>+~]) ?', r'\1', ' '.join(text.split())))
+            continue
+        declarations = []
+        for declaration in text.split(';'):
+            name, _, value = declaration.partition(':')
+            if name.strip():
+                declarations.append((name.strip(), re.sub(r' ?([,!]) ?', r'\1', ' '.join(value.split()))))
+        rules.append((tuple(preludes), declarations))
+        preludes.pop()
+    return rules
+
+
+class StaticAssetTest(TestCase):
+    def read_static(self, name):
+        with open(os.path.join(settings.BASE_DIR, 'static', name), encoding='utf-8') as f:
+            return f.read()
+
+    @skipUnless(shutil.which('node'), 'needs node')
+    def test_minified_js_behaves_like_the_source(self):
+        source = self.read_static('js/main.js')
+        minified = MINIFIERS['.js'](source)
+        self.assertLess(len(minified), len(source))
+        self.assertEqual(js_trace(minified), js_trace(source))
+
+    def test_minified_css_keeps_every_rule(self):
+        source = self.read_static('css/styles.css')
+        minified = MINIFIERS['.css'](source)
+        self.assertLess(len(minified), len(source))
+        self.assertEqual(css_rules(minified), css_rules(source))
+
+    def test_collectstatic_builds_hashed_compressed_assets(self):
+        source = os.path.join(settings.BASE_DIR, 'static', 'js', 'main.js')
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'tracker.assets.MinifiedStaticFilesStorage'},
+        }):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('js/main.js')
+            self.assertRegex(hashed, r'^js/main\.[0-9a-f]{12}\.js$')
+            self.assertLess(os.path.getsize(os.path.join(root, hashed)), os.path.getsize(source))
+            self.assertTrue(os.path.exists(os.path.join(root, hashed + '.gz')))
+
+            middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+            response = middleware(RequestFactory().get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'max-age=31536000, public, immutable')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            # The unhashed name may change content, so it is only cached briefly.
+            response = middleware(RequestFactory().get('/static/js/main.js'))
+            self.assertNotIn('immutable', response['Cache-Control'])
+
+
+class HealthCheckTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_settings_import_does_no_io(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'admissions_tracker', 'settings', 'production.py')
+        no_io = AssertionError('production settings must not do I/O on import')
+        with mock.patch('socket.socket.connect', side_effect=no_io), \
+                mock.patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection', side_effect=no_io):
+            settings = runpy.run_path(path, run_name='admissions_tracker.settings.production')
+        self.assertEqual(settings['READINESS_TTL'], 30)
+
+    @skipUnless(find_spec('psycopg_pool'), 'psycopg_pool is not installed')
+    def test_asgi_pool_is_sized_for_concurrent_requests(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'admissions_tracker', 'settings', 'production.py')
+        for mode, size in [('wsgi', 2), ('asgi', 10)]:
+            with self.subTest(mode=mode), mock.patch.dict(os.environ, {'SERVER_MODE': mode}):
+                for name in ('DB_POOL_MAX_SIZE', 'GUNICORN_THREADS'):
+                    os.environ.pop(name, None)
+                settings = runpy.run_path(path, run_name='admissions_tracker.settings.production')
+                self.assertEqual(settings['DATABASES']['default']['OPTIONS']['pool']['max_size'], size)
+
+    def test_healthz_caches_result(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('healthz'))
+            self.client.get(reverse('healthz'))
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertTrue(report['ok'])
+        self.assertEqual(set(report['checks']), {'database', 'storage'})
+
+    def test_failed_check_returns_503(self):
+        def broken():
+            raise OSError('connection refused by db.internal:5432')
+
+        with mock.patch.dict(health.READINESS_CHECKS, {'database': broken}):
+            response = self.client.get(reverse('healthz'))
+            self.assertEqual(response.status_code, 503)
+            # Names and statuses only; the error text stays in the logs.
+            self.assertEqual(response.json(), {'ok': False, 'checks': {'database': 'failing', 'storage': 'ok'}})
+            self.assertNotIn(b'db.internal', response.content)
+            with self.assertRaises(CommandError):
+                call_command('check_readiness', stdout=StringIO())
+
+        out = StringIO()
+        call_command('check_readiness', 'database', stdout=out)
+        self.assertIn('database: ok', out.getvalue())
+
+    def test_storage_outage_keeps_instance_ready(self):
+        def broken():
+            raise OSError('bucket unreachable')
+
+        with mock.patch.dict(health.READINESS_CHECKS, {'storage': broken}):
+            response = self.client.get(reverse('healthz'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['checks'], {'database': 'ok', 'storage': 'failing'})
+            out = StringIO()
+            call_command('check_readiness', stdout=out)
+            self.assertIn('storage: bucket unreachable', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('check_readiness', 'storage', stdout=StringIO())
+
+
+class LikeCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='liker', password='password')
+        self.post = create_post()
+        self.url = reverse('like_post', args=[self.post.id])
+        self.client.force_login(self.user)
+
+    def like(self, **body):
+        return self.client.post(self.url, json.dumps(body) if body else '', content_type='application/json').json()
+
+    def test_toggle_updates_counter(self):
+        with self.assertNumQueries(10):
+            data = self.like()
+        self.assertEqual((data['liked'], data['likes_count']), (True, 1))
+        data = self.like()
+        self.assertEqual((data['liked'], data['likes_count']), (False, 0))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_repeated_state_is_idempotent(self):
+        for _ in range(2):
+            data = self.like(liked=True)
+        self.assertEqual((data['liked'], data['likes_count']), (True, 1))
+        self.assertEqual(self.post.likes.count(), 1)
+        for _ in range(2):
+            data = self.like(liked=False)
+        self.assertEqual((data['liked'], data['likes_count']), (False, 0))
+
+    def test_like_does_not_touch_updated_at(self):
+        updated_at = self.post.updated_at
+        self.like()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_at, updated_at)
+
+    def test_relation_changes_and_user_deletion_keep_counter(self):
+        other = User.objects.create_user(username='other', password='password')
+        self.post.likes.add(self.user, other)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        other.liked_posts.clear()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.user.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.like()
+        AdmissionPost.objects.update(likes_count=7)
+        out = StringIO()
+        call_command('reconcile_likes', stdout=out)
+        self.assertIn('1 posts', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+
+class CommentTreeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='commenter', password='password', anonymous_username='Heron')
+        self.post = create_post()
+        self.url = reverse('get_comments', args=[self.post.id])
+
+    def comment(self, content, parent=None):
+        return Comment.objects.create(post=self.post, user=self.user, content=content, parent=parent)
+
+    def test_nested_thread_without_duplicates(self):
+        first = self.comment('first')
+        reply = self.comment('reply', parent=first)
+        nested = self.comment('nested', parent=reply)
+        self.comment('second')
+        self.assertEqual(nested.root_id, first.id)
+
+        data = self.client.get(self.url).json()
+        self.assertEqual([c['content'] for c in data['comments']], ['first', 'second'])
+        thread = data['comments'][0]
+        self.assertEqual(thread['user'], 'Heron')
+        self.assertEqual(thread['replies'][0]['content'], 'reply')
+        self.assertEqual(thread['replies'][0]['replies'][0]['content'], 'nested')
+        self.assertIsNone(data['next_cursor'])
+
+    def test_query_count_does_not_grow_with_thread(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url)
+            return len(queries)
+
+        parent = self.comment('top')
+        small = count_queries()
+        for i in range(10):
+            parent = self.comment(f'reply {i}', parent=parent if i % 2 else None)
+        self.assertEqual(count_queries(), small)
+
+    def test_cursor_pages_top_level_comments(self):
+        for i in range(COMMENT_PAGE_SIZE + 3):
+            self.comment(f'comment {i}')
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['comments']), COMMENT_PAGE_SIZE)
+        data = self.client.get(self.url, {'cursor': data['next_cursor']}).json()
+        self.assertEqual([c['content'] for c in data['comments']], [f'comment {i}' for i in range(COMMENT_PAGE_SIZE, COMMENT_PAGE_SIZE + 3)])
+        self.assertIsNone(data['next_cursor'])
+
+
+class LiveEventsTest(TestCase):
+    def test_wsgi_request_is_told_to_stop(self):
+        self.assertEqual(self.client.get(reverse('live_events')).status_code, 204)
+
+    async def test_stream_pushes_new_posts_and_comments(self):
+        response = await self.async_client.get(reverse('live_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        @sync_to_async
+        def create_post_and_comment():
+            with self.captureOnCommitCallbacks(execute=True):
+                post = create_post(university='Live University')
+                user = User.objects.create_user(username='live', password='password')
+                Comment.objects.create(post=post, user=user, content='Congrats!')
+            return post
+
+        post = await create_post_and_comment()
+        event = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertIn('event: post\n', event)
+        self.assertIn('"university": "Live University"', event)
+        event = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertIn('event: comment\n', event)
+        self.assertIn(f'"post_id": {post.id}, "parent_id": null, "comment_count": 1', event)
+        # The ASGI handler cancels a disconnected client's stream, which drops its queue.
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertFalse(live.broker.subscribers)
+
+
+class AsyncReadViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='password', anonymous_username='Lark')
+        self.post = create_post(university='Async University')
+        top = Comment.objects.create(post=self.post, user=self.user, content='top')
+        Comment.objects.create(post=self.post, user=self.user, content='reply', parent=top)
+        self.post.likes.add(self.user)
+
+    async def test_timeline_page_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('timeline_page'))
+        data = response.json()
+        self.assertIn('Async University', data['html'])
+        self.assertIn('like-btn liked', data['html'])
+        self.assertIsNone(data['next_cursor'])
+
+    async def test_comments_under_asgi(self):
+        response = await self.async_client.get(reverse('get_comments', args=[self.post.id]))
+        thread = response.json()['comments'][0]
+        self.assertEqual((thread['user'], thread['replies'][0]['content']), ('Lark', 'reply'))
+        response = await self.async_client.get(reverse('get_comments', args=[self.post.id + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AnonymousResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='password')
+        self.post = create_post(university='Cached University')
+        self.timeline = reverse('admission_timeline')
+
+    def test_repeat_and_conditional_requests(self):
+        first = self.client.get(self.timeline, {'sort': '-updated_at'})
+        self.assertContains(first, 'Cached University')
+        self.assertNotContains(first, 'csrfmiddlewaretoken')
+        self.assertIn('csrftoken', first.cookies)
+        self.assertTrue(first['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', first)
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.timeline, {'sort': '-updated_at'})
+            not_modified = self.client.get(self.timeline, {'sort': '-updated_at'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertNotEqual(self.client.get(self.timeline, {'sort': '-test_score'})['ETag'], first['ETag'])
+
+    def test_writes_invalidate_dependent_pages_only(self):
+        stats = self.client.get(reverse('admission_stats'))
+        timeline = self.client.get(self.timeline)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.user, content='Fresh comment')
+        self.assertEqual(self.client.get(reverse('admission_stats'))['ETag'], stats['ETag'])
+        response = self.client.get(self.timeline, HTTP_IF_NONE_MATCH=timeline['ETag'])
+        self.assertContains(response, 'Fresh comment')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_like(self.post.id, self.user.id)
+        self.assertContains(self.client.get(self.timeline), 'Like (1)')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_post(university='Newer University')
+        self.assertContains(self.client.get(reverse('admission_stats')), 'Newer University')
+
+    def test_signed_in_users_are_not_served_from_cache(self):
+        self.client.get(self.timeline)
+        self.client.force_login(self.user)
+        response = self.client.get(self.timeline)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+
+class PostCardFragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password', anonymous_username='Finch')
+        self.reader = User.objects.create_user(username='reader', password='password')
+        self.post = create_post(university='Fragment University')
+        self.comment = Comment.objects.create(post=self.post, user=self.author, content='First!')
+        self.url = reverse('timeline_page')
+
+    def html(self, user):
+        self.client.force_login(user)
+        return self.client.get(self.url).json()['html']
+
+    def test_fragments_are_reused_until_post_or_comments_change(self):
+        self.html(self.reader)
+        # update() skips updated_at, so a reused fragment still shows the old values.
+        AdmissionPost.objects.filter(pk=self.post.pk).update(university='Renamed University')
+        Comment.objects.filter(pk=self.comment.pk).update(content='Edited')
+        html = self.html(self.reader)
+        self.assertIn('Fragment University', html)
+        self.assertIn('First!', html)
+
+        self.post.refresh_from_db()
+        self.post.save()
+        Comment.objects.create(post=self.post, user=self.reader, content='Second')
+        html = self.html(self.reader)
+        self.assertIn('Renamed University', html)
+        self.assertIn('Edited', html)
+        self.assertIn('Second', html)
+
+    def test_per_viewer_state_stays_outside_fragments(self):
+        set_like(self.post.id, self.author.id)
+        reader_html = self.html(self.reader)
+        author_html = self.html(self.author)
+        self.assertNotIn('like-btn liked', reader_html)
+        self.assertIn('like-btn liked', author_html)
+        self.assertIn('Like (1)', reader_html)
+        # Only the commenter gets a delete button, even though the reader's copy was cached first.
+        delete_button = f'data-comment-id="{self.comment.id}"'
+        self.assertNotIn(delete_button, reader_html)
+        self.assertIn(delete_button, author_html)
+        self.assertNotIn(delete_button, self.html(self.reader))
+
+    def test_only_renames_retire_cached_comments(self):
+        self.html(self.reader)
+        versions = get_versions('users')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='newcomer', password='password').generate_verification_token()
+            self.reader.email_verified = True
+            self.reader.save()
+        self.assertEqual(get_versions('users'), versions)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.anonymous_username = 'Wren'
+            self.author.save()
+        self.assertNotEqual(get_versions('users'), versions)
+        self.assertIn('Wren', self.html(self.reader))
+
+    def test_cached_comments_are_not_loaded(self):
+        Comment.objects.create(post=create_post(), user=self.author, content='Elsewhere')
+        with CaptureQueriesContext(connection) as cold:
+            self.html(self.reader)
+        with CaptureQueriesContext(connection) as warm:
+            self.html(self.reader)
+        # One query for the whole page on a miss, none once the fragments are cached.
+        self.assertEqual(len(self.comment_loads(cold)), 1)
+        self.assertEqual(self.comment_loads(warm), [])
+
+    def comment_loads(self, queries):
+        return [query['sql'] for query in queries.captured_queries if '"tracker_comment"."content"' in query['sql']]
+
+    def test_display_name_change_refreshes_comments(self):
+        self.html(self.reader)
+        self.author.anonymous_username = 'Sparrow'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertIn('Sparrow', self.html(self.reader))
+
+
+class AnalyticsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for year, status, gpa, scale, score in [
+            (2023, 'ACCEPTED', 3.9, 4.0, 330), (2023, 'REJECTED', 3.0, 4.0, 300), (2023, 'APPLIED', None, 4.0, None),
+            (2024, 'ACCEPTED', 9.0, 10.0, 325), (2024, 'ENROLLED', 3.7, 4.0, 320), (2024, 'REJECTED', 3.1, 4.0, 310),
+            (2024, 'REJECTED', 2.9, 4.0, 305),
+        ]:
+            create_post(year=year, status=status, gpa=gpa, gpa_scale=scale, test_type=' gre', test_score=score)
+        create_post(university='Elsewhere', year=2024, status='ACCEPTED')
+
+    def test_rates_distributions_and_trend(self):
+        data = self.client.get(reverse('analytics'), {'university': 'Test'}).json()
+        self.assertEqual((data['total'], data['admissions'], data['rejections']), (7, 3, 3))
+        self.assertEqual(data['acceptance_rate'], 0.5)
+        self.assertEqual(data['trend']['years'], [2023, 2024])
+        self.assertEqual(data['trend']['acceptance_rate'], [0.5, 0.5])
+        self.assertEqual(data['trend']['rate_change'], [None, 0.0])
+        # GPAs are compared on a 4.0 scale.
+        self.assertEqual(data['gpa']['admissions']['count'], 3)
+        self.assertEqual(data['gpa']['admissions']['percentiles']['50'], 3.7)
+        self.assertEqual(sum(data['gpa']['rejections']['histogram']), 3)
+        self.assertEqual(data['test_scores']['GRE']['admissions']['mean'], 325.0)
+
+    def test_results_are_cached_per_filter_until_posts_change(self):
+        url = reverse('analytics')
+        self.client.get(url, {'year': 2024})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'year': 2024}).json()['total'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_post(year=2024, status='REJECTED')
+        self.assertEqual(self.client.get(url, {'year': 2024}).json()['total'], 6)
+        self.assertEqual(self.client.get(url).json()['total'], 9)
+        empty = self.client.get(url, {'university': 'Nowhere'}).json()
+        self.assertEqual((empty['total'], empty['acceptance_rate'], empty['trend']['years']), (0, None, []))
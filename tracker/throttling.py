@@ -0,0 +1,134 @@
+import math
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from .metrics import registry
+
+# scope -> {'user': rate, 'ip': rate}. A rate is "<requests>/<period>" with an
+# optional count of s, m, h or d, e.g. "30/10m". The per-IP rate is looser than
+# the per-user one because a campus or office can share a single address.
+THROTTLE_RATES = {
+    'post': {'user': '10/h', 'ip': '20/h'},
+    'comment': {'user': '30/10m', 'ip': '60/10m'},
+    'like': {'user': '120/m', 'ip': '240/m'},
+}
+# Counters live in their own cache so page-cache culling never resets them. Its
+# backend's incr should be atomic across workers (Redis in production);
+# LocMemCache is atomic within a process, and FileBasedCache can let a few extra
+# requests through under contention.
+THROTTLE_CACHE_ALIAS = 'throttle'
+# Reverse proxies in front of the app; the client address is taken from X-Forwarded-For past them.
+THROTTLE_PROXY_COUNT = 0
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache
+def parse_rate(rate):
+    """``"30/10m"`` -> ``(30, 600)``."""
+    count, period = rate.split('/')
+    multiple = int(period[:-1]) if len(period) > 1 else 1
+    return int(count), multiple * PERIODS[period[-1]]
+
+
+def client_ip(request):
+    proxies = getattr(settings, 'THROTTLE_PROXY_COUNT', THROTTLE_PROXY_COUNT)
+    if proxies:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def throttle_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', THROTTLE_CACHE_ALIAS)]
+
+
+def take_token(key, rate, now=None):
+    """Take one token from the bucket at ``key``; return 0 if allowed, else seconds until a token frees up.
+
+    The bucket holds ``count`` tokens and refills over ``period``. It is kept
+    as two cache counters, for the current and previous period, and the
+    previous one is weighted by how much of it still overlaps the trailing
+    period. That approximates a continuously refilling bucket with one atomic
+    ``incr``, and works on any shared cache backend.
+    """
+    cache = throttle_cache()
+    count, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    slot, elapsed = divmod(now, period)
+    current_key = f'throttle:{key}:{int(slot)}'
+    previous = cache.get(f'throttle:{key}:{int(slot) - 1}', 0)
+    cache.add(current_key, 0, timeout=period * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Evicted between add and incr.
+        cache.set(current_key, 1, timeout=period * 2)
+        current = 1
+    weight = 1 - elapsed / period
+    if previous * weight + current <= count:
+        return 0
+    cache.decr(current_key)
+    current -= 1
+    # Wait for the previous period to decay enough, or for this one to become the previous.
+    if current < count and previous:
+        wait = period * (1 - (count - 1 - current) / previous) - elapsed
+    else:
+        wait = period - elapsed + period * max(0, 1 - (count - 1) / max(current, 1))
+    return max(1, math.ceil(wait))
+
+
+def return_token(key, rate, now):
+    """Give back a token taken from ``key`` by ``take_token(key, rate, now)``."""
+    period = parse_rate(rate)[1]
+    try:
+        throttle_cache().decr(f'throttle:{key}:{int(now // period)}')
+    except ValueError:
+        # Already expired.
+        pass
+
+
+def throttle(scope, methods=('POST',)):
+    """Limit ``methods`` on a view with the ``scope`` buckets, per user and per client IP.
+
+    Signed-in requests take a token from both buckets, anonymous ones from the
+    IP bucket only; a request refused by one bucket is not charged to the
+    other. Over the limit the view is not called; the response is a 429 with
+    Retry-After, as JSON for JSON requests. Apply it inside any login check, so
+    requests that are turned away anyway use up nothing.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+            rates = getattr(settings, 'THROTTLE_RATES', THROTTLE_RATES)[scope]
+            buckets = [(f'{scope}:ip:{client_ip(request)}', rates['ip'])]
+            if request.user.is_authenticated:
+                buckets.insert(0, (f'{scope}:user:{request.user.pk}', rates['user']))
+            now = time.time()
+            for i, (key, rate) in enumerate(buckets):
+                retry_after = take_token(key, rate, now)
+                if retry_after:
+                    for taken_key, taken_rate in buckets[:i]:
+                        return_token(taken_key, taken_rate, now)
+                    return throttled_response(request, scope, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def throttled_response(request, scope, retry_after):
+    registry.inc('tracker_throttled_requests_total', {'scope': scope})
+    message = f"Too many requests. Please try again in {retry_after} seconds."
+    if request.content_type == 'application/json':
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -11,11 +11,21 @@ urlpatterns = [
     path('api/reply/<int:comment_id>/', views.add_reply, name='add_reply'),
     path('api/comments/<int:post_id>/', views.get_comments, name='get_comments'),
     path('api/delete_comment/<int:comment_id>/', views.delete_comment, name='delete_comment'),
+    path('api/timeline/', views.timeline_page, name='timeline_page'),
+    path('api/search/', views.search_posts, name='search_posts'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
+    path('api/live/', views.live_events, name='live_events'),
+    path('api/analytics/', views.analytics, name='analytics'),
+    path('api/stats/', views.stats_api, name='stats_api'),
     path('account/settings/', views.account_settings, name='account_settings'),
     path('account/delete/', views.delete_account, name='delete_account'),
     path('', views.admission_dashboard, name='admission_timeline'),
     path('stats/', views.AdmissionStatsView.as_view(), name='admission_stats'),
+    path('export/<str:kind>/', views.export, name='export'),
+    path('healthz/', views.healthz, name='healthz'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('activate/<uidb64>/<token>/', views.activate, name='activate'),
+    path('notifications/confirm/<str:token>/', views.confirm_comment_notifications, name='confirm_comment_notifications'),
     path('password_reset/', auth_views.PasswordResetView.as_view(template_name='registration/password_reset_form.html'), 
          name='password_reset'),
     path('password_reset/done/', auth_views.PasswordResetDoneView.as_view(template_name='registration/password_reset_done.html'), 
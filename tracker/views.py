@@ -1,13 +1,38 @@
+import hashlib
+import logging
+from collections import defaultdict
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.core.exceptions import BadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_POST
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.template.response import TemplateResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView
-from .models import AdmissionPost, Comment, User
+from .models import AdmissionPost, AdmissionStatsRollup, Comment, User
 from .forms import AdmissionPostForm, CommentForm
+from . import health, live, metrics, search
+from .analytics import admission_analytics
+from .caching import cache_anonymous_response, get_last_modified, get_versions, versioned_key
+from .comments import acomment_tree
+from .exports import EXPORT_FORMATS, ExportError, async_chunks, export_chunks
+from .likes import set_like
+from .mail import confirm_digest_email, queue_digest_confirmation, queue_email
+from .pagination import akeyset_page, keyset_page
+from .replicas import read_replica
+from .stats import StatsFilterError, decode_table, stats_facets, stats_params, stats_table
+from .throttling import throttle
 from django.contrib import messages
 import json
 from .forms import UserSettingsForm
@@ -17,10 +42,14 @@ from django.urls import reverse
 from django.contrib.sites.shortcuts import get_current_site
 
 from django.template.loader import render_to_string
-from django.utils.http import urlsafe_base64_encode
+from django.utils.http import http_date, quote_etag, urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.utils.encoding import force_str  
 from django.utils.http import urlsafe_base64_decode
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -65,7 +94,7 @@ def register(request):
                 'uid': urlsafe_base64_encode(force_bytes(user.pk)),
                 'token': user.verification_token,
             })
-            user.email_user(subject, message)
+            queue_email(subject, message, user.email)
 
             messages.success(request, 'Please confirm your email to complete registration.')
             return redirect('login')
@@ -92,6 +121,13 @@ def activate(request, uidb64, token):
         messages.error(request, 'Activation link is invalid!')
         return redirect('admission_timeline')  
 
+def confirm_comment_notifications(request, token):
+    if confirm_digest_email(token):
+        messages.success(request, 'Comment notifications are confirmed for your post.')
+    else:
+        messages.error(request, 'Confirmation link is invalid or has expired!')
+    return redirect('admission_timeline')
+
 def user_login(request):
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
@@ -124,82 +160,130 @@ def user_logout(request):
     messages.success(request, "You have been successfully logged out.")
     return redirect('admission_timeline')
 
-def admission_dashboard(request):
+TIMELINE_SORTS = ['-created_at', '-updated_at', '-test_score', 'test_score']
+TIMELINE_PAGE_SIZE = 20
+SEARCH_RESULTS_LIMIT = 20
+
+
+def _count_subquery(model, field):
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
+
+def timeline_queryset(user):
+    liked = AdmissionPost.likes.through.objects.filter(admissionpost_id=OuterRef('pk'), user_id=user.pk)
+    commented = Comment.objects.filter(post=OuterRef('pk'), user_id=user.pk)
+    last_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    return AdmissionPost.objects.annotate(
+        comment_count=_count_subquery(Comment, 'post'),
+        last_comment_at=Subquery(last_comment),
+        liked=Exists(liked) if user.is_authenticated else Value(False),
+        commented=Exists(commented) if user.is_authenticated else Value(False),
+    )
+
+
+class PageComments:
+    """The comments of a page of post cards, loaded in one query the first time a card's cached comments miss."""
+
+    def __init__(self, posts):
+        self.post_ids = [post.pk for post in posts]
+        self.by_post = None
+
+    def for_post(self, post_id):
+        if self.by_post is None:
+            self.by_post = defaultdict(list)
+            for comment in Comment.objects.filter(post_id__in=self.post_ids).select_related('user'):
+                self.by_post[comment.post_id].append(comment)
+        return self.by_post[post_id]
+
+
+def timeline_sort(request):
     sort_by = request.GET.get('sort', '-created_at')
-    posts = AdmissionPost.objects.annotate(comment_count=Count('comments')).order_by(sort_by)
-    
+    return sort_by if sort_by in TIMELINE_SORTS else '-created_at'
+
+
+def timeline_context(posts, next_cursor, sort_by, user):
+    comments = PageComments(posts)
+    for post in posts:
+        post.card_comments = partial(comments.for_post, post.pk)
+        # Only viewers with comments of their own to delete need their own copy of the cached comments.
+        post.comment_viewer = user.pk if post.commented else None
+    # Cached post cards also show commenters' display names, which live outside the post's own rows.
+    return {'posts': posts, 'next_cursor': next_cursor, 'sort': sort_by, 'card_version': get_versions('users')[0]}
+
+
+def timeline_page_context(request):
+    sort_by = timeline_sort(request)
+    posts, next_cursor = keyset_page(
+        timeline_queryset(request.user), sort_by,
+        cursor=request.GET.get('cursor'), page_size=TIMELINE_PAGE_SIZE,
+    )
+    return timeline_context(posts, next_cursor, sort_by, request.user)
+
+
+def render_timeline_posts(request, posts, next_cursor, sort_by):
+    context = timeline_context(posts, next_cursor, sort_by, request.user)
+    return render_to_string('tracker/timeline_posts.html', context, request=request)
+
+
+@read_replica
+@cache_anonymous_response('timeline', ['posts', 'comments', 'likes', 'users'])
+@throttle('post')
+def admission_dashboard(request):
     if request.method == 'POST':
         form = AdmissionPostForm(request.POST)
         if form.is_valid():
             post = form.save(commit=False)
             if request.user.is_authenticated:
                 post.user = request.user
+                # An address the account has already verified needs no second confirmation.
+                post.email_confirmed = bool(
+                    post.email and request.user.email_verified and post.email.lower() == request.user.email.lower()
+                )
             post.save()
             messages.success(request, "Your admission post has been created successfully.")
+            if post.notify_comments and not post.email_confirmed:
+                queue_digest_confirmation(post, get_current_site(request).domain)
+                messages.info(request, "Please confirm your email to start receiving comment notifications.")
             return redirect('admission_timeline')
         else:
-            print(form.errors)
+            logger.info("Rejected admission post with errors in: %s", ', '.join(form.errors))
             messages.error(request, "There was an error with your submission. Please check the form and try again.")
-    else:
-        form = AdmissionPostForm()
-    
-    sort_by = request.GET.get('sort', '-created_at')
-    posts = AdmissionPost.objects.annotate(comment_count=Count('comments')).order_by(sort_by)
-    
-    context = {
-        'posts': posts,
-        'form': AdmissionPostForm(),
-    }
-    return render(request, 'tracker/admission_timeline.html', context)
 
+    context = timeline_page_context(request)
+    context['form'] = AdmissionPostForm()
+    return TemplateResponse(request, 'tracker/admission_timeline.html', context)
+
+@read_replica
+async def timeline_page(request):
+    sort_by = timeline_sort(request)
+    posts, next_cursor = await akeyset_page(
+        timeline_queryset(await request.auser()), sort_by,
+        cursor=request.GET.get('cursor'), page_size=TIMELINE_PAGE_SIZE,
+    )
+    # Template rendering is sync-only (context processors may touch the database).
+    html = await sync_to_async(render_timeline_posts)(request, posts, next_cursor, sort_by)
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+@method_decorator(read_replica, name='dispatch')
+@method_decorator(cache_anonymous_response('stats', ['posts']), name='dispatch')
 class AdmissionStatsView(ListView):
-    model = AdmissionPost
+    model = AdmissionStatsRollup
     template_name = 'tracker/admission_stats.html'
     context_object_name = 'admissions'
 
-    STATUS_GROUPS = {
-        'admissions': ['ACCEPTED', 'ACCEPTED FROM WAITLIST', 'ENROLLED'],
-        'rejections': ['REJECTED', 'REJECTED FROM WAITLIST'],
-        'in_progress': ['APPLIED', 'APPLYING', 'WAITLISTED', 'INTERVIEW'],
-        'questions': ['QUESTION'],
-    }
+    STATUS_GROUPS = AdmissionPost.STATUS_GROUPS
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Filter based on query parameters
-        filters = {}
-        if self.request.GET.get('university'):
-            filters['university__icontains'] = self.request.GET['university']
-        if self.request.GET.get('major'):
-            filters['major__icontains'] = self.request.GET['major']
-        if self.request.GET.get('degree_type'):
-            filters['degree_type'] = self.request.GET['degree_type']
-        if self.request.GET.get('year'):
-            filters['year'] = self.request.GET['year']
-        if self.request.GET.get('term'):
-            filters['term'] = self.request.GET['term']
-
-        queryset = queryset.filter(**filters)
-
-        count_type = self.request.GET.get('count_type', 'all')
-        if count_type != 'all' and count_type in self.STATUS_GROUPS:
-            queryset = queryset.filter(status__in=self.STATUS_GROUPS[count_type])
-
-        return queryset.values('university', 'major', 'degree_type', 'year', 'term').annotate(
-            admissions_count=Count('id', filter=Q(status__in=self.STATUS_GROUPS['admissions'])),
-            rejections_count=Count('id', filter=Q(status__in=self.STATUS_GROUPS['rejections'])),
-            in_progress_count=Count('id', filter=Q(status__in=self.STATUS_GROUPS['in_progress'])),
-            questions_count=Count('id', filter=Q(status__in=self.STATUS_GROUPS['questions'])),
-            total_count=Count('id')
-        )
+        try:
+            return list(decode_table(stats_table(self.request.GET)))
+        except StatsFilterError as e:
+            raise BadRequest(str(e))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['universities'] = AdmissionPost.objects.values_list('university', flat=True).distinct()
-        context['majors'] = AdmissionPost.objects.values_list('major', flat=True).distinct()
+        context.update(stats_facets())
         context['degree_types'] = dict(AdmissionPost.DEGREE_CHOICES)
-        context['years'] = AdmissionPost.objects.values_list('year', flat=True).distinct().order_by('-year')
         context['terms'] = dict(AdmissionPost.TERM_CHOICES)
         context['count_types'] = [
             ('all', 'All Statuses'),
@@ -212,6 +296,7 @@ class AdmissionStatsView(ListView):
 
 @login_required
 @require_POST
+@throttle('comment')
 def add_comment(request, post_id):
     post = get_object_or_404(AdmissionPost, id=post_id)
     data = json.loads(request.body)
@@ -230,28 +315,39 @@ def add_comment(request, post_id):
         })
     return JsonResponse({'success': False, 'errors': form.errors}, status=400)
 
+def json_login_required(message):
+    """Like ``login_required``, but answering with a 403 JSON error instead of a redirect."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'success': False, 'error': message}, status=403)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
 @require_POST
+@json_login_required('You must be logged in to like a post.')
+@throttle('like')
 def like_post(request, post_id):
-    if not request.user.is_authenticated:
-        return JsonResponse({'success': False, 'error': 'You must be logged in to like a post.'}, status=403)
-    
-    post = get_object_or_404(AdmissionPost, id=post_id)
-    if request.user in post.likes.all():
-        post.likes.remove(request.user)
-        liked = False
-    else:
-        post.likes.add(request.user)
-        liked = True
-    
+    get_object_or_404(AdmissionPost.objects.only('id'), id=post_id)
+    # Clients send the state they want, so a double click cannot undo itself; no body toggles.
+    try:
+        desired = json.loads(request.body or '{}').get('liked')
+    except (ValueError, AttributeError):
+        desired = None
+    liked, likes_count = set_like(post_id, request.user.pk, liked=None if desired is None else bool(desired))
+
     return JsonResponse({
         'success': True,
-        'likes_count': post.likes.count(),
+        'likes_count': likes_count,
         'liked': liked,
     })
 
 
 @login_required
 @require_POST
+@throttle('comment')
 def add_reply(request, comment_id):
     parent_comment = get_object_or_404(Comment, id=comment_id)
     data = json.loads(request.body)
@@ -268,26 +364,16 @@ def add_reply(request, comment_id):
             'reply_id': reply.id,
             'reply_content': reply.content,
             'reply_date': reply.created_at.strftime("%B %d, %Y %I:%M %p"),
-            'reply_user': reply.user.username,
+            'reply_user': reply.user.get_display_name(),
         })
     return JsonResponse({'success': False, 'error': 'Reply content is required.'}, status=400)
 
-def get_comments(request, post_id):
-    post = get_object_or_404(AdmissionPost, id=post_id)
-    comments = post.comments.all().order_by('created_at')
-    comment_data = [{
-        'id': comment.id,
-        'user': comment.user.username,
-        'content': comment.content,
-        'created_at': comment.created_at.strftime("%B %d, %Y %I:%M %p"),
-        'replies': [{
-            'id': reply.id,
-            'user': reply.user.username,
-            'content': reply.content,
-            'created_at': reply.created_at.strftime("%B %d, %Y %I:%M %p"),
-        } for reply in comment.replies.all()]
-    } for comment in comments]
-    return JsonResponse({'comments': comment_data})
+@read_replica
+async def get_comments(request, post_id):
+    if not await AdmissionPost.objects.filter(id=post_id).aexists():
+        raise Http404('No AdmissionPost matches the given query.')
+    comments, next_cursor = await acomment_tree(post_id, cursor=request.GET.get('cursor'))
+    return JsonResponse({'comments': comments, 'next_cursor': next_cursor})
 
 @login_required
 @require_POST
@@ -297,4 +383,90 @@ def delete_comment(request, comment_id):
         post_id = comment.post.id
         comment.delete()
         return JsonResponse({'success': True, 'post_id': post_id})
-    return JsonResponse({'success': False, 'error': 'You are not authorized to delete this comment.'}, status=403)
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'You are not authorized to delete this comment.'}, status=403)
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.search_posts(query, limit=SEARCH_RESULTS_LIMIT)
+    return JsonResponse({'results': [{
+        'id': post.id,
+        'university': post.university,
+        'major': post.major,
+        'degree_type': post.get_degree_type_display(),
+        'status': post.get_status_display(),
+        'year': post.year,
+        'term': post.get_term_display(),
+        'created_at': post.created_at.strftime("%B %d, %Y %I:%M %p"),
+    } for post in posts]})
+
+def autocomplete(request):
+    field = request.GET.get('field')
+    if field not in search.AUTOCOMPLETE_FIELDS:
+        return JsonResponse({'success': False, 'error': 'Unknown autocomplete field.'}, status=400)
+    return JsonResponse({'results': search.autocomplete(field, request.GET.get('q', ''))})
+
+
+def analytics(request):
+    try:
+        return JsonResponse(admission_analytics(request.GET))
+    except StatsFilterError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@gzip_page
+@read_replica
+def stats_api(request):
+    """The stats page's rows, column-oriented; see ``stats.encode_table``."""
+    try:
+        params = stats_params(request.GET)
+    except StatsFilterError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    key = versioned_key('stats_table', ['posts'], params)
+    etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+    last_modified = get_last_modified('posts')
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(stats_table(request.GET), json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@read_replica
+def export(request, kind):
+    fmt = request.GET.get('format', 'csv')
+    try:
+        chunks = export_chunks(kind, fmt, request.GET)
+    except ExportError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    if isinstance(request, ASGIRequest):
+        chunks = async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="admission_{kind}.{fmt}"'
+    return response
+
+
+@never_cache
+def healthz(request):
+    report = health.readiness()
+    return JsonResponse(health.public_report(report), status=200 if report['ok'] else 503)
+
+
+@never_cache
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=403)
+    body = metrics.render_prometheus(metrics.collect())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def live_events(request):
+    # The stream holds its connection open; only the ASGI server can do that without tying up a worker.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(live.event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response